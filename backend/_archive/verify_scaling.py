@@ -16,6 +16,7 @@ from app.models import Scan, RiskLevel, PlatformType, User
 
 async def verify_redis():
     print("\n🔹 [1/3] Verifying Redis...")
+    await redis_client.connect()
     if not redis_client.client:
         print("❌ Redis Client is None (Not connected)")
         return
@@ -23,21 +24,21 @@ async def verify_redis():
     # Test Set
     key = "test:scaling:key"
     val = "hello_redis"
-    success = redis_client.setex(key, 10, val)
+    success = await redis_client.setex(key, 10, val)
     if not success:
         print("❌ Redis SET failed")
         return
         
     # Test Get
-    retrieved = redis_client.get(key)
+    retrieved = await redis_client.get(key)
     if retrieved == val:
         print(f"✅ Redis SET/GET working. Value: {retrieved}")
     else:
         print(f"❌ Redis GET mismatch. Expected {val}, got {retrieved}")
         
     # Test Delete
-    redis_client.delete(key)
-    if not redis_client.get(key):
+    await redis_client.delete(key)
+    if not await redis_client.get(key):
         print("✅ Redis DELETE working")
 
 
@@ -1,5 +1,8 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseSettings):
@@ -10,6 +13,23 @@ class Settings(BaseSettings):
     # Database (SQLite for local, PostgreSQL for production)
     DATABASE_URL: str = "sqlite+aiosqlite:///./detooz.db"
     
+    # Connection pool (PostgreSQL only)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_TIMEOUT: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    # Seconds before a single Postgres query is abandoned, so a stuck query can't pin a pooled connection
+    DB_COMMAND_TIMEOUT: float = 30
+    # Set when connecting through pgbouncer in transaction mode (disables asyncpg prepared statement caches)
+    DB_PGBOUNCER: bool = False
+    # Prepared statements kept per pooled connection (asyncpg and SQLAlchemy default to 100)
+    DB_STATEMENT_CACHE_SIZE: int = 1024
+    # Compiled-SQL cache entries per engine (SQLAlchemy default is 500)
+    DB_QUERY_CACHE_SIZE: int = 1200
+    
+    # Comma-separated proxy IPs trusted to set X-Forwarded-For ("*" only behind a proxy that overwrites it)
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
@@ -22,6 +42,9 @@ class Settings(BaseSettings):
     GROQ_API_KEY: str = ""
     GEMINI_API_KEY: str = ""
     OPENROUTER_API_KEY: str = ""
+    # Per-process caps on Groq calls; match the requests/sec to your Groq plan
+    GROQ_MAX_CONCURRENCY: int = 8
+    GROQ_REQUESTS_PER_SECOND: float = 5.0
     
     # Firebase Cloud Messaging (for push notifications)
     FCM_SERVER_KEY: str = ""
@@ -45,5 +68,5 @@ def get_settings():
 
 
 settings = get_settings()
-print(f"DEBUG: Groq Key Loaded: {'YES' if settings.GROQ_API_KEY else 'NO'}")
-print(f"DEBUG: Groq Key Starts With: {settings.GROQ_API_KEY[:4] if settings.GROQ_API_KEY else 'N/A'}")
+logger.debug("Groq Key Loaded: %s", "YES" if settings.GROQ_API_KEY else "NO")
+logger.debug("Groq Key Starts With: %s", settings.GROQ_API_KEY[:4] if settings.GROQ_API_KEY else "N/A")
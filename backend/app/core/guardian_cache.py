@@ -0,0 +1,78 @@
+"""Short-lived caches of guardian links: who a user guards, and who guards them"""
+import orjson
+from sqlalchemy import select, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import GuardianLink, User
+from app.core.redis_client import redis_client
+
+# Links change rarely; the TTL only bounds staleness from paths that don't invalidate (e.g. account deletion)
+GUARDIAN_CACHE_TTL = 300
+
+# Read on every HIGH-risk scan; short TTL since it also carries guardians' FCM tokens
+GUARDIANS_CACHE_TTL = 60
+
+
+def _key(user_id: int) -> str:
+    return f"gprot:{user_id}"
+
+
+async def is_protecting_anyone(db: AsyncSession, user_id: int) -> bool:
+    """True if user_id is the guardian on any active link"""
+    cached = await redis_client.get(_key(user_id))
+    if cached is not None:
+        return cached == "1"
+
+    protecting = bool(await db.scalar(
+        select(exists().where(
+            GuardianLink.guardian_id == user_id,
+            GuardianLink.status == 'active'
+        ))
+    ))
+    await redis_client.setex(_key(user_id), GUARDIAN_CACHE_TTL, "1" if protecting else "0")
+    return protecting
+
+
+async def invalidate_guardian_cache(user_id: int):
+    """Drop the cached flag after a link involving user_id as guardian is created or removed"""
+    await redis_client.delete(_key(user_id))
+
+
+def _guardians_key(user_id: int) -> str:
+    return f"guardians:{user_id}"
+
+
+async def get_active_guardians(db: AsyncSession, user_id: int) -> list[dict]:
+    """id, email and fcm_token of each guardian on user_id's active links"""
+    cached = await redis_client.get(_guardians_key(user_id))
+    if cached is not None:
+        return orjson.loads(cached)
+
+    result = await db.execute(
+        select(User.id, User.email, User.fcm_token)
+        .join(GuardianLink, GuardianLink.guardian_id == User.id)
+        .where(
+            GuardianLink.user_id == user_id,
+            GuardianLink.status == "active"
+        )
+    )
+    guardians = [dict(row._mapping) for row in result]
+    await redis_client.setex(_guardians_key(user_id), GUARDIANS_CACHE_TTL, orjson.dumps(guardians).decode())
+    return guardians
+
+
+async def invalidate_guardians(user_id: int):
+    """Drop user_id's cached guardian list after one of their links is created or removed"""
+    await redis_client.delete(_guardians_key(user_id))
+
+
+async def invalidate_guardian_contact(db: AsyncSession, guardian_id: int):
+    """Drop the cached guardian lists that include guardian_id (e.g. after their FCM token changes)"""
+    result = await db.execute(
+        select(GuardianLink.user_id).where(
+            GuardianLink.guardian_id == guardian_id,
+            GuardianLink.status == "active"
+        )
+    )
+    for user_id in result.scalars():
+        await invalidate_guardians(user_id)
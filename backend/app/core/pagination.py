@@ -0,0 +1,20 @@
+"""Keyset paging cursors for the newest-first history lists"""
+from datetime import datetime
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """X-Next-Cursor value for the last row of a page: its (created_at, id) keyset position"""
+    return f"{created_at.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Parse a `before` cursor back into (created_at, id).
+    The id breaks ties between rows sharing a timestamp, so none are skipped at a page boundary.
+    """
+    try:
+        created_at, row_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio as aioredis
 import logging
 import time
 from typing import Optional, Dict, Any
@@ -26,6 +27,11 @@ class InMemoryCache:
         self._cache[key] = {'value': value, 'expires_at': time.time() + ttl}
         return True
     
+    def setex_nx(self, key: str, ttl: int, value: str) -> bool:
+        if self.get(key) is not None:
+            return False
+        return self.setex(key, ttl, value)
+    
     def delete(self, key: str) -> bool:
         self._cache.pop(key, None)
         return True
@@ -34,6 +40,26 @@ class InMemoryCache:
         self._cleanup_expired()
         return key in self._cache
     
+    def setex_get(self, key: str, ttl: int, value: str) -> Optional[str]:
+        old = self.get(key)
+        self.setex(key, ttl, value)
+        return old
+    
+    def getdel(self, key: str) -> Optional[str]:
+        value = self.get(key)
+        self._cache.pop(key, None)
+        return value
+    
+    def ttl(self, key: str) -> int:
+        """Seconds left on key; -1 if it has no expiry, -2 if missing (matches Redis TTL)"""
+        self._cleanup_expired()
+        item = self._cache.get(key)
+        if item is None:
+            return -2
+        if item['expires_at'] == float('inf'):
+            return -1
+        return int(item['expires_at'] - time.time())
+    
     def _cleanup_expired(self):
         now = time.time()
         expired_keys = [k for k, v in self._cache.items() if v['expires_at'] <= now]
@@ -41,6 +67,11 @@ class InMemoryCache:
             del self._cache[k]
 
 class RedisClient:
+    """
+    Async Redis wrapper so cache round trips never block the event loop.
+    Starts on the in-memory fallback; connect() (called from the app lifespan)
+    switches to Redis once a ping succeeds.
+    """
     _instance = None
     
     def __new__(cls):
@@ -48,20 +79,19 @@ class RedisClient:
             cls._instance = super(RedisClient, cls).__new__(cls)
             cls._instance.client = None
             cls._instance.fallback = InMemoryCache()
-            cls._instance.using_fallback = False
-            cls._instance.connect()
+            cls._instance.using_fallback = True
         return cls._instance
     
-    def connect(self):
+    async def connect(self):
         try:
-            self.client = redis.from_url(
+            self.client = aioredis.from_url(
                 settings.REDIS_URL, 
                 decode_responses=True,
                 socket_timeout=2,
                 socket_connect_timeout=2
             )
             # Test connection
-            self.client.ping()
+            await self.client.ping()
             logger.info("✅ Redis Connected Successfully")
             self.using_fallback = False
         except redis.ConnectionError as e:
@@ -72,53 +102,97 @@ class RedisClient:
             logger.error(f"❌ Unexpected Redis Error: {e}. Using in-memory fallback.")
             self.client = None
             self.using_fallback = True
+    
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+        self.using_fallback = True
             
-    def get(self, key: str):
+    async def get(self, key: str):
         if self.using_fallback or not self.client:
             return self.fallback.get(key)
         try:
-            return self.client.get(key)
+            return await self.client.get(key)
         except redis.RedisError as e:
             logger.error(f"Redis GET Error: {e}")
             return self.fallback.get(key)
             
-    def set(self, key: str, value: str):
+    async def set(self, key: str, value: str):
         if self.using_fallback or not self.client:
             return self.fallback.set(key, value)
         try:
-            return self.client.set(key, value)
+            return await self.client.set(key, value)
         except redis.RedisError as e:
             logger.error(f"Redis SET Error: {e}")
             return self.fallback.set(key, value)
 
-    def setex(self, key: str, time_seconds: int, value: str):
+    async def setex(self, key: str, time_seconds: int, value: str):
         """Set key with expiration (time in seconds)"""
         if self.using_fallback or not self.client:
             return self.fallback.setex(key, time_seconds, value)
         try:
-            return self.client.setex(key, time_seconds, value)
+            return await self.client.setex(key, time_seconds, value)
         except redis.RedisError as e:
             logger.error(f"Redis SETEX Error: {e}")
             return self.fallback.setex(key, time_seconds, value)
 
-    def delete(self, key: str):
+    async def setex_nx(self, key: str, time_seconds: int, value: str) -> bool:
+        """Set key with expiration only if it doesn't exist (SET ... EX ... NX); False if it did"""
+        if self.using_fallback or not self.client:
+            return self.fallback.setex_nx(key, time_seconds, value)
+        try:
+            return bool(await self.client.set(key, value, ex=time_seconds, nx=True))
+        except redis.RedisError as e:
+            logger.error(f"Redis SET NX Error: {e}")
+            return self.fallback.setex_nx(key, time_seconds, value)
+
+    async def delete(self, key: str):
         if self.using_fallback or not self.client:
             return self.fallback.delete(key)
         try:
-            self.client.delete(key)
+            await self.client.delete(key)
             return True
         except redis.RedisError as e:
             logger.error(f"Redis DELETE Error: {e}")
             return self.fallback.delete(key)
             
-    def exists(self, key: str) -> bool:
+    async def exists(self, key: str) -> bool:
         if self.using_fallback or not self.client:
             return self.fallback.exists(key)
         try:
-            return bool(self.client.exists(key))
+            return bool(await self.client.exists(key))
         except redis.RedisError:
             return self.fallback.exists(key)
 
+    async def setex_get(self, key: str, time_seconds: int, value: str):
+        """Set key with expiration and return its previous value in one step (SET ... EX ... GET)"""
+        if self.using_fallback or not self.client:
+            return self.fallback.setex_get(key, time_seconds, value)
+        try:
+            return await self.client.set(key, value, ex=time_seconds, get=True)
+        except redis.RedisError as e:
+            logger.error(f"Redis SET GET Error: {e}")
+            return self.fallback.setex_get(key, time_seconds, value)
+
+    async def getdel(self, key: str):
+        """Atomically read and delete key (Redis GETDEL)"""
+        if self.using_fallback or not self.client:
+            return self.fallback.getdel(key)
+        try:
+            return await self.client.getdel(key)
+        except redis.RedisError as e:
+            logger.error(f"Redis GETDEL Error: {e}")
+            return self.fallback.getdel(key)
+
+    async def ttl(self, key: str) -> int:
+        if self.using_fallback or not self.client:
+            return self.fallback.ttl(key)
+        try:
+            return await self.client.ttl(key)
+        except redis.RedisError as e:
+            logger.error(f"Redis TTL Error: {e}")
+            return self.fallback.ttl(key)
+
 # Global instance
 redis_client = RedisClient()
-
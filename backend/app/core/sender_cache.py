@@ -0,0 +1,90 @@
+"""Short-lived cache of per-user trusted / blocked sender lookups"""
+import asyncio
+import orjson
+from sqlalchemy import select, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import TrustedSender, BlockedSender
+from app.core.redis_client import redis_client
+
+# Add/remove paths invalidate; the TTL only bounds staleness from paths that don't (e.g. account deletion)
+SENDER_CACHE_TTL = 60
+
+
+def _trusted_key(user_id: int, sender: str) -> str:
+    return f"trusted:{user_id}:{sender}"
+
+
+def _blocked_key(user_id: int, sender: str) -> str:
+    return f"blocked:{user_id}:{sender}"
+
+
+async def lookup_trusted(db: AsyncSession, user_id: int, sender: str) -> dict | None:
+    """{"name": ...} if user_id trusts sender, else None"""
+    cached = await redis_client.get(_trusted_key(user_id, sender))
+    if cached is not None:
+        return orjson.loads(cached)
+
+    result = await db.execute(
+        select(TrustedSender.name).where(
+            TrustedSender.user_id == user_id,
+            TrustedSender.sender == sender
+        )
+    )
+    row = result.first()
+    trusted = {"name": row.name} if row else None
+    await redis_client.setex(_trusted_key(user_id, sender), SENDER_CACHE_TTL, orjson.dumps(trusted).decode())
+    return trusted
+
+
+async def is_trusted(db: AsyncSession, user_id: int, sender: str) -> bool:
+    return await lookup_trusted(db, user_id, sender) is not None
+
+
+async def lookup_sender(db: AsyncSession, user_id: int, sender: str) -> tuple[bool, dict | None]:
+    """
+    (is_blocked, lookup_trusted) for one sender.
+    Both cache reads are in flight together, and a miss on either is answered by one query.
+    """
+    blocked_cached, trusted_cached = await asyncio.gather(
+        redis_client.get(_blocked_key(user_id, sender)),
+        redis_client.get(_trusted_key(user_id, sender))
+    )
+    if blocked_cached is not None and trusted_cached is not None:
+        return blocked_cached == "1", orjson.loads(trusted_cached)
+
+    trusted_criteria = (TrustedSender.user_id == user_id, TrustedSender.sender == sender)
+    row = (await db.execute(select(
+        exists().where(BlockedSender.user_id == user_id, BlockedSender.sender == sender),
+        exists().where(*trusted_criteria),
+        select(TrustedSender.name).where(*trusted_criteria).scalar_subquery()
+    ))).one()
+    blocked = bool(row[0])
+    trusted = {"name": row[2]} if row[1] else None
+
+    await asyncio.gather(
+        redis_client.setex(_blocked_key(user_id, sender), SENDER_CACHE_TTL, "1" if blocked else "0"),
+        redis_client.setex(_trusted_key(user_id, sender), SENDER_CACHE_TTL, orjson.dumps(trusted).decode())
+    )
+    return blocked, trusted
+
+
+async def trusted_among(db: AsyncSession, user_id: int, senders: set[str]) -> set[str]:
+    """The subset of senders user_id trusts, in one query (for batches)"""
+    result = await db.execute(
+        select(TrustedSender.sender).where(
+            TrustedSender.user_id == user_id,
+            TrustedSender.sender.in_(senders)
+        )
+    )
+    return set(result.scalars())
+
+
+async def invalidate_trusted(user_id: int, sender: str):
+    """Drop the cached lookup after sender is added to or removed from the trusted list"""
+    await redis_client.delete(_trusted_key(user_id, sender))
+
+
+async def invalidate_blocked(user_id: int, sender: str):
+    """Drop the cached lookup after sender is blocked or unblocked"""
+    await redis_client.delete(_blocked_key(user_id, sender))
@@ -0,0 +1,24 @@
+"""Cache of each user's dashboard stats (/user/stats), dropped whenever their counts change"""
+from app.core.redis_client import redis_client
+
+# Scan / block / trust / guardian writes invalidate; the TTL only bounds staleness
+# from paths that don't (e.g. the archiver pruning old scans)
+USER_STATS_CACHE_TTL = 300
+
+
+def _key(user_id: int) -> str:
+    return f"stats:{user_id}"
+
+
+async def get_cached_stats(user_id: int) -> str | None:
+    """Cached UserStats JSON, or None on a miss"""
+    return await redis_client.get(_key(user_id))
+
+
+async def cache_stats(user_id: int, stats_json: str):
+    await redis_client.setex(_key(user_id), USER_STATS_CACHE_TTL, stats_json)
+
+
+async def invalidate_user_stats(user_id: int):
+    """Drop user_id's cached stats after a write that changes any of their counts"""
+    await redis_client.delete(_key(user_id))
@@ -1,2 +1,2 @@
 # Database package
-from app.db.database import Base, get_db, init_db, engine
+from app.db.database import Base, get_db, init_db, engine, commit_without_flush_wait
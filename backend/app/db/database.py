@@ -1,7 +1,11 @@
+import logging
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Handle both SQLite and PostgreSQL
 if settings.DATABASE_URL.startswith("sqlite"):
     DATABASE_URL = settings.DATABASE_URL
@@ -9,7 +13,33 @@ else:
     # Convert sync PostgreSQL URL to async
     DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-engine = create_async_engine(DATABASE_URL, echo=settings.DEBUG)
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=settings.DEBUG,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE
+    )
+else:
+    # Pgbouncer in transaction mode can't keep prepared statements across transactions
+    statement_cache_size = 0 if settings.DB_PGBOUNCER else settings.DB_STATEMENT_CACHE_SIZE
+    connect_args = {
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        "statement_cache_size": statement_cache_size,
+        "prepared_statement_cache_size": statement_cache_size
+    }
+    
+    # Keep warm connections: every request goes through get_db
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=settings.DEBUG,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args=connect_args
+    )
 
 async_session = async_sessionmaker(
     engine,
@@ -35,14 +65,26 @@ async def get_db():
             await session.close()
 
 
+async def commit_without_flush_wait(db: AsyncSession):
+    """
+    Commit without waiting for Postgres to flush the WAL to disk.
+    Only for rows a crash can afford to lose (scan history): the commit is visible
+    to other sessions immediately, but the last few hundred ms of such commits may
+    be lost if the server crashes. SQLite commits normally.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(text("SET LOCAL synchronous_commit TO OFF"))
+    await db.commit()
+
+
 async def init_db():
     """Initialize database tables"""
-    print("DEBUG: Initializing database...")
+    logger.debug("Initializing database...")
     try:
         async with engine.begin() as conn:
-            print("DEBUG: Connection opened, running metadata create_all...")
+            logger.debug("Connection opened, running metadata create_all...")
             await conn.run_sync(Base.metadata.create_all)
-            print("DEBUG: Database initialization successful.")
-    except Exception as e:
-        print(f"DEBUG: Database initialization failed: {e}")
+            logger.debug("Database initialization successful.")
+    except Exception:
+        logger.exception("Database initialization failed")
         raise
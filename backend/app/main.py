@@ -1,18 +1,62 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.pool import QueuePool
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from app.routers import auth, scan, sms, trusted_sender, user, feedback, reputation, manual_scan
 from app.routers import guardian_link, guardian_alerts, admin, privacy, education
+from app.config import settings
 from app.db import init_db
+from app.db.database import engine
+from app.core.redis_client import redis_client
+from app.services.audit_buffer import audit_buffer
+from app.services.fcm_service import fcm_service
+from app.services.url_scraper import url_scraper
 # Import all models so they're registered with SQLAlchemy before init_db
 from app.models import User, Scan, TrustedSender, Feedback, Blacklist, UserSettings, GuardianLink, GuardianAlert, FeedArticle, CuratedArticle, UserBookmark
 import asyncio
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 logger = logging.getLogger(__name__)
 
 
+def start_log_listener() -> QueueListener:
+    """
+    Route the app.* loggers through a queue so formatting and the stream
+    write happen on a listener thread, not in request coroutines.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(levelname)s: %(name)s: %(message)s"))
+    
+    app_logger = logging.getLogger("app")
+    app_logger.addHandler(QueueHandler(log_queue))
+    app_logger.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
+    app_logger.propagate = False
+    
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
+def stop_log_listener(listener: QueueListener):
+    """
+    Undo start_log_listener: detach its queue handler and hand app.* records
+    back to the root logger, so repeated startups (tests, reloads) don't stack handlers.
+    """
+    app_logger = logging.getLogger("app")
+    for handler in list(app_logger.handlers):
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            app_logger.removeHandler(handler)
+    app_logger.setLevel(logging.NOTSET)
+    app_logger.propagate = True
+    listener.stop()
+
+
 async def auto_sync_feeds():
     """Background task to sync RSS feeds periodically"""
     from app.db.database import async_session
@@ -30,23 +74,53 @@ async def auto_sync_feeds():
         await asyncio.sleep(30 * 60)
 
 
+async def auto_purge_accounts():
+    """Background task to purge deleted accounts whose background purge never finished"""
+    from app.db.database import async_session
+    from app.services.account_purge import purge_deleted_accounts, PURGE_SWEEP_INTERVAL
+    
+    while True:
+        try:
+            async with async_session() as db:
+                purged = await purge_deleted_accounts(db)
+                if purged:
+                    logger.info(f"Account purge sweep: purged {purged} accounts")
+        except Exception:
+            logger.exception("Account purge sweep error")
+        
+        await asyncio.sleep(PURGE_SWEEP_INTERVAL)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database on startup and start background tasks"""
+    log_listener = start_log_listener()
     await init_db()
+    await redis_client.connect()
+    audit_buffer.start()
     
     # Start feed auto-sync in background
     sync_task = asyncio.create_task(auto_sync_feeds())
     logger.info("Started RSS feed auto-sync (every 30 minutes)")
     
+    # Sweep runs once at startup too, so purges cut short by a restart get finished
+    purge_task = asyncio.create_task(auto_purge_accounts())
+    
     yield
     
-    # Cancel background task on shutdown
-    sync_task.cancel()
-    try:
-        await sync_task
-    except asyncio.CancelledError:
-        pass
+    # Cancel background tasks on shutdown
+    for task in (sync_task, purge_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
+    await audit_buffer.stop()
+    await fcm_service.close()
+    await url_scraper.close()
+    await redis_client.close()
+    stop_log_listener(log_listener)
 
 
 
@@ -54,7 +128,8 @@ app = FastAPI(
     title="Detooz API",
     description="AI-powered scam detection backend",
     version="1.3.0",  # Version bump for guardian system
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson serializes datetimes natively and much faster
 )
 
 # Mount static files for image uploads
@@ -75,6 +150,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Resolve the real client IP from X-Forwarded-For once, for every request
+app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=settings.FORWARDED_ALLOW_IPS)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(scan.router, prefix="/api/scan", tags=["Scam Detection"])
@@ -100,4 +178,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Connection pool usage, for spotting pool exhaustion under load
+    pool = engine.pool
+    db_pool = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    } if isinstance(pool, QueuePool) else None
+    return {"status": "healthy", "db_pool": db_pool}
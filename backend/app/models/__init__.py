@@ -1,8 +1,9 @@
 # Models package
 from app.models.models import (
     User, Scan, PlatformType, RiskLevel,
-    TrustedSender, Feedback, Blacklist, UserSettings,
+    TrustedSender, BlockedSender, Feedback, Blacklist, UserSettings,
     GuardianLink, GuardianAlert, ConsentLog,
-    FeedArticle, CuratedArticle, UserBookmark, ArticleCategory
+    FeedArticle, CuratedArticle, UserBookmark, ArticleCategory,
+    SUPPORTED_LANGUAGES, ALERT_THRESHOLDS
 )
 
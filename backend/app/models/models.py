@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Index, CheckConstraint, Enum as SQLEnum, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 from app.db.database import Base
 import enum
 
@@ -29,6 +30,7 @@ class User(Base):
     phone = Column(String(20), nullable=True)
     country_code = Column(String(5), default="+91", nullable=True)
     is_active = Column(Boolean, default=True)
+    deleted_at = Column(DateTime, nullable=True)  # Account deletion requested; data purged in the background
     fcm_token = Column(String(255), nullable=True)  # Firebase Cloud Messaging token
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -45,12 +47,20 @@ class User(Base):
     # Relationships
     scans = relationship("Scan", back_populates="user", cascade="all, delete-orphan")
     
+    @hybrid_property
+    def full_name(self):
+        """Display name; usable in queries (User.full_name) as well as on instances"""
+        return self.first_name + " " + self.last_name
+    
     def __repr__(self):
         return f"<User {self.email}>"
 
 
 
 
+MESSAGE_PREVIEW_LENGTH = 200
+
+
 class Scan(Base):
     __tablename__ = "scans"
     
@@ -58,7 +68,7 @@ class Scan(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     sender = Column(String(50), nullable=True)
     message = Column(Text, nullable=True)
-    message_preview = Column(String(200), nullable=True)
+    message_preview = Column(String(MESSAGE_PREVIEW_LENGTH), nullable=True)
     platform = Column(SQLEnum(PlatformType), default=PlatformType.SMS)
     risk_level = Column(SQLEnum(RiskLevel), nullable=False)
     risk_reason = Column(Text, nullable=True)
@@ -71,6 +81,19 @@ class Scan(Base):
     # Relationships
     user = relationship("User", back_populates="scans")
     
+    __table_args__ = (
+        # History / recent lists: newest-first per user, paged by created_at
+        Index("ix_scans_user_created", "user_id", "created_at"),
+        # Per-risk counts and last scan for /user/stats and /sms/stats, answered
+        # from the index alone on Postgres
+        Index("ix_scans_user_risk", "user_id", "risk_level", postgresql_include=["created_at"]),
+    )
+    
+    @staticmethod
+    def preview(message: str) -> str:
+        """Truncate a message to fit message_preview"""
+        return message[:MESSAGE_PREVIEW_LENGTH]
+    
     def __repr__(self):
         return f"<Scan {self.id} - {self.risk_level}>"
 
@@ -89,10 +112,36 @@ class TrustedSender(Base):
     # Relationships
     user = relationship("User", backref="trusted_senders")
     
+    __table_args__ = (
+        Index("ix_trusted_senders_user_sender", "user_id", "sender", unique=True),
+    )
+    
     def __repr__(self):
         return f"<TrustedSender {self.sender}>"
 
 
+class BlockedSender(Base):
+    """Blocked senders are flagged HIGH risk without running detection"""
+    __tablename__ = "blocked_senders"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sender = Column(String(100), nullable=False)
+    reason = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    user = relationship("User", backref="blocked_senders")
+    
+    __table_args__ = (
+        # Probed on every inbound SMS
+        Index("ix_blocked_senders_user_sender", "user_id", "sender", unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<BlockedSender {self.sender}>"
+
+
 class Feedback(Base):
     """User feedback on scan results for model improvement"""
     __tablename__ = "feedback"
@@ -120,7 +169,7 @@ class Blacklist(Base):
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String(20), nullable=False, index=True)  # "url", "phone", "domain"
     value = Column(String(500), nullable=False)
-    value_hash = Column(String(64), nullable=False, index=True)  # SHA256 hash for fast lookup
+    value_hash = Column(String(64), nullable=False, index=True)  # BLAKE2b-128 hex (32 chars) for fast lookup
     source = Column(String(50), nullable=True)  # "community", "system", "verified"
     reports_count = Column(Integer, default=1)
     first_reported_at = Column(DateTime, default=datetime.utcnow)
@@ -136,10 +185,27 @@ class Blacklist(Base):
     language = Column(String(10), default="en")  # Message language
     features_detected = Column(Text, nullable=True)  # JSON string of scam indicators
     
+    __table_args__ = (
+        # One row per reported value; also the conflict target for the report upsert
+        Index("ix_blacklist_type_value_hash", "type", "value_hash", unique=True),
+        # /reputation/verified: top verified entries by report count
+        Index("ix_blacklist_verified_reports", "reports_count",
+              postgresql_where=text("is_verified = true"), sqlite_where=text("is_verified = 1")),
+    )
+    
     def __repr__(self):
         return f"<Blacklist {self.type}: {self.value[:30]}>"
 
 
+# Allowed UserSettings values (enforced by CHECK constraints; the API validates against the same sets)
+SUPPORTED_LANGUAGES = frozenset({"en", "hi", "ta", "te", "mr", "bn"})
+ALERT_THRESHOLDS = frozenset({"HIGH", "MEDIUM", "ALL"})
+
+
+def _in_check(column: str, values: frozenset) -> str:
+    return f"{column} IN ({', '.join(repr(v) for v in sorted(values))})"
+
+
 class UserSettings(Base):
     """User preferences and settings"""
     __tablename__ = "user_settings"
@@ -161,6 +227,11 @@ class UserSettings(Base):
     # Relationships
     user = relationship("User", backref="settings")
     
+    __table_args__ = (
+        CheckConstraint(_in_check("language", SUPPORTED_LANGUAGES), name="ck_user_settings_language"),
+        CheckConstraint(_in_check("alert_guardians_threshold", ALERT_THRESHOLDS), name="ck_user_settings_threshold"),
+    )
+    
     def __repr__(self):
         return f"<UserSettings user={self.user_id}>"
 
@@ -189,6 +260,14 @@ class GuardianLink(Base):
     guardian = relationship("User", foreign_keys=[guardian_id], backref="protected_users")
     user = relationship("User", foreign_keys=[user_id], backref="guardians_links")
     
+    __table_args__ = (
+        # Partial indexes: every hot lookup only cares about active links
+        Index("ix_gl_user_active", "user_id",
+              postgresql_where=text("status = 'active'"), sqlite_where=text("status = 'active'")),
+        Index("ix_gl_guardian_active", "guardian_id",
+              postgresql_where=text("status = 'active'"), sqlite_where=text("status = 'active'")),
+    )
+    
     def __repr__(self):
         return f"<GuardianLink user={self.user_id} guardian={self.guardian_id} status={self.status}>"
 
@@ -215,6 +294,11 @@ class GuardianAlert(Base):
     guardian = relationship("User", foreign_keys=[guardian_id])
     user = relationship("User", foreign_keys=[user_id])
     scan = relationship("Scan", backref="guardian_alerts")
+    
+    __table_args__ = (
+        # Serves /pending and keyset-paged /history (guardian_id = ? ORDER BY created_at DESC)
+        Index("ix_guardian_alerts_guardian_created", "guardian_id", "created_at"),
+    )
 
 
 class ConsentLog(Base):
@@ -232,6 +316,13 @@ class ConsentLog(Base):
     
     user = relationship("User", backref="consent_history")
     
+    __table_args__ = (
+        # GDPR export streams a user's history newest-first; on Postgres the
+        # INCLUDE columns make it an index-only scan
+        Index("ix_consent_logs_user_created", "user_id", "created_at",
+              postgresql_include=["consent_type", "consent_given", "consent_version"]),
+    )
+    
     def __repr__(self):
         return f"<GuardianAlert id={self.id} status={self.status}>"
 
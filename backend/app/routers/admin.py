@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, text, distinct
+from sqlalchemy import select, func, distinct
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Any
 
 from app.db import get_db
 from app.models import User, GuardianAlert, Scan, GuardianLink
+from app.services.account_purge import purge_user
 
 router = APIRouter()
 
@@ -108,7 +109,7 @@ async def get_all_users(db: AsyncSession = Depends(get_db)):
     return [
         AdminUserView(
             id=u.id, 
-            name=f"{u.first_name} {u.last_name}", 
+            name=u.full_name, 
             email=u.email, 
             phone=u.phone, 
             created_at=u.created_at
@@ -130,7 +131,7 @@ async def get_active_guardians(db: AsyncSession = Depends(get_db)):
     return [
         AdminGuardianView(
             id=u.id, 
-            name=f"{u.first_name} {u.last_name}", 
+            name=u.full_name, 
             email=u.email, 
             phone=u.phone, 
             created_at=u.created_at
@@ -152,15 +153,22 @@ async def get_all_alerts(db: AsyncSession = Depends(get_db)):
     )
     alerts = result.scalars().all()
     
+    # One IN (...) lookup for both sides instead of two db.get() calls per alert
+    user_ids = {a.user_id for a in alerts} | {a.guardian_id for a in alerts}
+    users_by_id = {}
+    if user_ids:
+        users = await db.execute(select(User).where(User.id.in_(user_ids)))
+        users_by_id = {u.id: u for u in users.scalars().all()}
+    
     view_models = []
     for alert in alerts:
-        u = await db.get(User, alert.user_id)
-        g = await db.get(User, alert.guardian_id)
+        u = users_by_id.get(alert.user_id)
+        g = users_by_id.get(alert.guardian_id)
         
         view_models.append(AdminAlertView(
             id=alert.id,
-            user_name=f"{u.first_name} {u.last_name}" if u else "Unknown",
-            guardian_name=f"{g.first_name} {g.last_name}" if g else "Unknown",
+            user_name=u.full_name if u else "Unknown",
+            guardian_name=g.full_name if g else "Unknown",
             risk_level="HIGH", # Alert is usually high risk
             message_preview="View details", # Simplification
             created_at=alert.created_at,
@@ -177,28 +185,8 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
         if not user:
             raise HTTPException(404, "User not found")
             
-        # Manually delete related records to avoid SQLite FK issues
-        # 1. Delete Guardian Alerts (References Scans, so delete first)
-        await db.execute(text("DELETE FROM guardian_alerts WHERE user_id = :uid OR guardian_id = :uid"), {"uid": user_id})
-        
-        # 2. Delete Guardian Links
-        await db.execute(text("DELETE FROM guardian_links WHERE user_id = :uid OR guardian_id = :uid"), {"uid": user_id})
-
-        # 3. Delete Feedback (References Scans)
-        await db.execute(text("DELETE FROM feedback WHERE user_id = :uid"), {"uid": user_id})
-        
-        # 4. Delete Scans
-        await db.execute(text("DELETE FROM scans WHERE user_id = :uid"), {"uid": user_id})
-        
-        # 5. Delete Trusted Senders
-        await db.execute(text("DELETE FROM trusted_senders WHERE user_id = :uid"), {"uid": user_id})
-        
-        # 6. Delete User Settings
-        await db.execute(text("DELETE FROM user_settings WHERE user_id = :uid"), {"uid": user_id})
-
-        # Finally delete User
-        await db.delete(user)
-        await db.commit()
+        # Manual cascade (SQLite doesn't enforce FK cascades), chunked per table
+        await purge_user(db, user_id)
         return {"message": "User deleted"}
     except Exception as e:
         await db.rollback()
@@ -1,9 +1,10 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, exists
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from jose import JWTError, jwt, jwk
 from passlib.context import CryptContext
 from app.config import settings
 from app.db import get_db
@@ -16,6 +17,11 @@ router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# JWT key resolved once at import; every login/refresh/request reuses it
+_JWT_KEY = jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+_JWT_ALGORITHM = settings.ALGORITHM
+_JWT_ALGORITHMS = [settings.ALGORITHM]
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -25,11 +31,21 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# bcrypt is deliberately slow (~100ms); request handlers run it in a worker thread
+# so one login doesn't stall every other request on the event loop
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.to_thread(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return jwt.encode(to_encode, _JWT_KEY, algorithm=_JWT_ALGORITHM)
 
 
 async def get_current_user(
@@ -42,7 +58,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -52,7 +68,8 @@ async def get_current_user(
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
     
-    if user is None:
+    # Deleted accounts are deactivated first and purged in the background
+    if user is None or not user.is_active:
         raise credentials_exception
     return user
 
@@ -65,8 +82,8 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     normalized_email = user_data.email.lower().strip()
 
     # Check if email exists
-    result = await db.execute(select(User).where(User.email == normalized_email))
-    if result.scalar_one_or_none():
+    email_taken = await db.scalar(select(exists().where(User.email == normalized_email)))
+    if email_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -75,8 +92,8 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if phone exists (if provided)
     if user_data.phone:
         normalized_phone = user_data.phone.strip()
-        result_phone = await db.execute(select(User).where(User.phone == normalized_phone))
-        if result_phone.scalar_one_or_none():
+        phone_taken = await db.scalar(select(exists().where(User.phone == normalized_phone)))
+        if phone_taken:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Phone number already registered"
@@ -85,7 +102,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Create new user
     user = User(
         email=normalized_email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         first_name=user_data.first_name,
         middle_name=user_data.middle_name,
         last_name=user_data.last_name,
@@ -94,7 +111,6 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     )
     db.add(user)
     await db.commit()
-    await db.refresh(user)
     
     # Create token
     access_token = create_access_token(
@@ -115,7 +131,7 @@ async def login(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not user.is_active or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
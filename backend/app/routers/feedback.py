@@ -93,7 +93,6 @@ async def submit_feedback(
     
     db.add(feedback)
     await db.commit()
-    await db.refresh(feedback)
     
     return feedback
 
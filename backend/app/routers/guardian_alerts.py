@@ -1,14 +1,22 @@
 """Guardian alerts router - polling endpoint for guardian notifications"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import joinedload
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+import hashlib
 
 from app.db import get_db
 from app.models import User, GuardianLink, GuardianAlert, Scan
 from app.routers.auth import get_current_user
+from app.core.redis_client import redis_client
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.guardian_alert_service import (
+    PENDING_ALERTS_CACHE_TTL,
+    pending_alerts_cache_key,
+    invalidate_pending_alerts_cache,
+)
 
 router = APIRouter()
 
@@ -39,6 +47,10 @@ class AlertResponse(BaseModel):
         from_attributes = True
 
 
+# Serializes a whole alert list in one pydantic-core call
+_alert_list_adapter = TypeAdapter(list[AlertResponse])
+
+
 class ActionRequest(BaseModel):
     action: str  # "contacted_user", "blocked_sender", "dismissed", "other"
     notes: str | None = None
@@ -50,59 +62,84 @@ class ActionResponse(BaseModel):
     action: str
 
 
+# ============ HELPERS ============
+
+def _json_response(request: Request, body: str) -> Response:
+    """Return a JSON body with an ETag, or 304 if the client already has it"""
+    etag = '"' + hashlib.blake2b(body.encode(), digest_size=16).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _fetch_alerts(db: AsyncSession, *criteria, limit: int | None = None) -> list[AlertResponse]:
+    """
+    Load a guardian's alerts newest-first with the protected user and scan
+    joined in, so the list costs one query instead of two per alert.
+    """
+    query = (
+        select(GuardianAlert, Scan, User.full_name, User.phone)
+        .join(User, User.id == GuardianAlert.user_id)
+        .join(Scan, Scan.id == GuardianAlert.scan_id)
+        .where(*criteria)
+        .order_by(GuardianAlert.created_at.desc(), GuardianAlert.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    
+    result = await db.execute(query)
+    
+    return [
+        AlertResponse(
+            id=alert.id,
+            user_id=alert.user_id,
+            user_name=user_name,
+            user_phone=user_phone,
+            scan_id=scan.id,
+            sender=scan.sender,
+            message_preview=scan.message_preview,
+            risk_level=scan.risk_level.value if scan.risk_level else "UNKNOWN",
+            risk_reason=scan.risk_reason,
+            scam_type=scan.scam_type,
+            confidence=scan.confidence,
+            status=alert.status,
+            created_at=alert.created_at,
+            seen_at=alert.seen_at
+        )
+        for alert, scan, user_name, user_phone in result.all()
+    ]
+
+
 # ============ ENDPOINTS ============
 
 @router.get("/pending", response_model=list[AlertResponse])
 async def get_pending_alerts(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get pending alerts for guardian (current_user).
+    Guardians poll this every few seconds, so the serialized list is cached
+    briefly and invalidated whenever an alert is created or changes status.
     """
     
+    cache_key = pending_alerts_cache_key(current_user.id)
+    cached = await redis_client.get(cache_key)
+    if cached:
+        return _json_response(request, cached)
+    
     # Get pending/seen alerts
-    result = await db.execute(
-        select(GuardianAlert).where(
-            GuardianAlert.guardian_id == current_user.id,
-            GuardianAlert.status.in_(["pending", "seen"])
-        ).order_by(GuardianAlert.created_at.desc())
+    response = await _fetch_alerts(
+        db,
+        GuardianAlert.guardian_id == current_user.id,
+        GuardianAlert.status.in_(["pending", "seen"])
     )
-    alerts = result.scalars().all()
     
-    response = []
-    for alert in alerts:
-        # Get user info (Protected User)
-        user_result = await db.execute(
-            select(User).where(User.id == alert.user_id)
-        )
-        user = user_result.scalar_one_or_none()
-        
-        # Get scan info
-        scan_result = await db.execute(
-            select(Scan).where(Scan.id == alert.scan_id)
-        )
-        scan = scan_result.scalar_one_or_none()
-        
-        if user and scan:
-            response.append(AlertResponse(
-                id=alert.id,
-                user_id=user.id,
-                user_name=f"{user.first_name} {user.last_name}",
-                user_phone=user.phone,
-                scan_id=scan.id,
-                sender=scan.sender,
-                message_preview=scan.message_preview,
-                risk_level=scan.risk_level.value if scan.risk_level else "UNKNOWN",
-                risk_reason=scan.risk_reason,
-                scam_type=scan.scam_type,
-                confidence=scan.confidence,
-                status=alert.status,
-                created_at=alert.created_at,
-                seen_at=alert.seen_at
-            ))
-    
-    return response
+    body = _alert_list_adapter.dump_json(response).decode()
+    await redis_client.setex(cache_key, PENDING_ALERTS_CACHE_TTL, body)
+    
+    return _json_response(request, body)
 
 
 @router.post("/{alert_id}/seen")
@@ -128,6 +165,7 @@ async def mark_alert_seen(
         alert.status = "seen"
         alert.seen_at = datetime.utcnow()
         await db.commit()
+        await invalidate_pending_alerts_cache(current_user.id)
     
     return {"message": "Alert marked as seen", "alert_id": alert_id}
 
@@ -165,6 +203,7 @@ async def take_action_on_alert(
         alert.seen_at = datetime.utcnow()
     
     await db.commit()
+    await invalidate_pending_alerts_cache(current_user.id)
     
     return ActionResponse(
         message=f"Action '{action_data.action}' recorded",
@@ -176,46 +215,29 @@ async def take_action_on_alert(
 @router.get("/history", response_model=list[AlertResponse])
 async def get_alert_history(
     limit: int = 50,
+    before: str | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all alerts (including actioned) for history view"""
+    """
+    Get all alerts (including actioned) for history view.
+    Pages by keyset: pass the X-Next-Cursor header from the previous page
+    as `before` to get the next `limit` older alerts.
+    """
     
-    result = await db.execute(
-        select(GuardianAlert).where(
-            GuardianAlert.guardian_id == current_user.id
-        ).order_by(GuardianAlert.created_at.desc()).limit(limit)
-    )
-    alerts = result.scalars().all()
+    criteria = [GuardianAlert.guardian_id == current_user.id]
+    if before is not None:
+        criteria.append(tuple_(GuardianAlert.created_at, GuardianAlert.id) < decode_cursor(before))
     
-    response = []
-    for alert in alerts:
-        user_result = await db.execute(
-            select(User).where(User.id == alert.user_id)
-        )
-        user = user_result.scalar_one_or_none()
-        
-        scan_result = await db.execute(
-            select(Scan).where(Scan.id == alert.scan_id)
-        )
-        scan = scan_result.scalar_one_or_none()
-        
-        if user and scan:
-            response.append(AlertResponse(
-                id=alert.id,
-                user_id=user.id,
-                user_name=f"{user.first_name} {user.last_name}",
-                user_phone=user.phone,
-                scan_id=scan.id,
-                sender=scan.sender,
-                message_preview=scan.message_preview,
-                risk_level=scan.risk_level.value if scan.risk_level else "UNKNOWN",
-                risk_reason=scan.risk_reason,
-                scam_type=scan.scam_type,
-                confidence=scan.confidence,
-                status=alert.status,
-                created_at=alert.created_at,
-                seen_at=alert.seen_at
-            ))
-    
-    return response
+    alerts = await _fetch_alerts(db, *criteria, limit=limit)
+    
+    headers = {}
+    if len(alerts) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(alerts[-1].created_at, alerts[-1].id)
+    
+    # Already validated AlertResponse objects; serialize once instead of re-validating per item
+    return Response(
+        content=_alert_list_adapter.dump_json(alerts),
+        media_type="application/json",
+        headers=headers
+    )
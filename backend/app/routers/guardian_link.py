@@ -1,18 +1,19 @@
 """Guardian linking router - OTP-based linking between users and guardians"""
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from datetime import datetime, timedelta
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import selectinload
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
-import random
-import string
-import json
+import secrets
 from typing import Dict
 
 from app.db import get_db
 from app.models import User, GuardianLink
 from app.routers.auth import get_current_user
 from app.core.redis_client import redis_client
+from app.core.guardian_cache import is_protecting_anyone, invalidate_guardian_cache, invalidate_guardians
+from app.core.stats_cache import invalidate_user_stats
 
 router = APIRouter()
 
@@ -55,7 +56,83 @@ class LinkedGuardianResponse(BaseModel):
 
 def generate_otp() -> str:
     """Generate 6-digit numeric OTP"""
-    return ''.join(random.choices(string.digits, k=6))
+    return f"{secrets.randbelow(1_000_000):06d}"
+
+
+async def _link_guardian(db: AsyncSession, current_user: User, protected_user_id: int, user_email: str) -> dict:
+    """Check linking constraints and create the active link for a verified OTP"""
+    
+    # Check email match
+    protected_email = await db.scalar(select(User.email).where(User.id == protected_user_id))
+    if protected_email != user_email:
+        raise HTTPException(status_code=400, detail="OTP matches a different user")
+    
+    # 4-6. Fetch every link relevant to the constraints below in one round trip
+    links = await db.execute(
+        select(GuardianLink.user_id, GuardianLink.guardian_id, GuardianLink.status).where(
+            or_(
+                and_(GuardianLink.user_id == current_user.id, GuardianLink.status == 'active'),
+                and_(GuardianLink.guardian_id == protected_user_id, GuardianLink.status == 'active'),
+                and_(GuardianLink.user_id == protected_user_id, GuardianLink.guardian_id == current_user.id)
+            )
+        )
+    )
+    has_guardians = is_protecting_others = already_linked = False
+    for link_user_id, link_guardian_id, link_status in links:
+        if link_status == 'active' and link_user_id == current_user.id:
+            has_guardians = True
+        if link_status == 'active' and link_guardian_id == protected_user_id:
+            is_protecting_others = True
+        if link_user_id == protected_user_id and link_guardian_id == current_user.id:
+            already_linked = True
+
+    # 4. CONSTRAINT: Guardian (B) cannot have their own Guardians (C)
+    if has_guardians:
+        raise HTTPException(
+            status_code=400, 
+            detail="You have guardians protecting you. You cannot be a guardian for others while protected."
+        )
+
+    # 5. CONSTRAINT: Protected User (A) cannot be a Guardian for others (X)
+    if is_protecting_others:
+        raise HTTPException(
+            status_code=400,
+            detail="The user you are trying to protect is already a guardian for someone else. Chains are not allowed."
+        )
+
+    # 6. Check if already linked
+    if already_linked:
+         # Already active, just return success
+         return {"message": "You are already protecting this user"}
+
+    # 7. Create ACTIVE Link
+    new_link = GuardianLink(
+        user_id=protected_user_id,
+        guardian_id=current_user.id,
+        status="active",
+        verified_at=datetime.utcnow()
+    )
+    
+    db.add(new_link)
+    await db.commit()
+    
+    return {
+        "message": f"You are now protecting {user_email}",
+        "user_email": user_email
+    }
+
+
+async def _restore_otp(otp_code: str, protected_user_id: int):
+    """
+    Re-insert a consumed OTP with the TTL still left on its otp_user key.
+    Skipped if the user has since generated a newer code; NX never overwrites
+    an otp: key that was set again in the meantime.
+    """
+    if await redis_client.get(f"otp_user:{protected_user_id}") != otp_code:
+        return
+    remaining = await redis_client.ttl(f"otp_user:{protected_user_id}")
+    if remaining > 0:
+        await redis_client.setex_nx(f"otp:{otp_code}", remaining, str(protected_user_id))
 
 
 # ============ USER ENDPOINTS (Protected User Side) ============
@@ -73,32 +150,24 @@ async def generate_link_otp(
     
     # CONSTRAINT CHECK: Can User A be protected?
     # If User A is already a guardian for someone else, they cannot be protected?
-    protecting_others = await db.execute(
-        select(GuardianLink).where(
-            GuardianLink.guardian_id == current_user.id,
-            GuardianLink.status == 'active'
-        )
-    )
-    if protecting_others.scalars().first():
+    if await is_protecting_anyone(db, current_user.id):
         raise HTTPException(
             status_code=400, 
             detail="You are currently a Guardian for someone. You cannot have a Guardian while you are protecting others."
         )
     
     otp_code = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=10)
     
     # Store in Redis
-    otp_data = {
-        "user_id": current_user.id,
-        "email": current_user.email,
-        "expires_at_iso": expires_at.isoformat()
-    }
+    # Key: otp:{otp_code} -> user_id, so verification is a single GET with no payload to parse.
+    # otp_user:{user_id} -> otp_code lets a regenerated OTP replace the previous one.
+    success = await redis_client.setex(f"otp:{otp_code}", 600, str(current_user.id))
     
-    # Use redis_client
-    # Key: otp:{otp_code} -> ensures uniqueness of code. 
-    # Production note: Better to key by user_id to prevent spam, but code lookup is faster for verification.
-    success = redis_client.setex(f"otp:{otp_code}", 600, json.dumps(otp_data))
+    # Swap in the new code and get the old one back in a single atomic step,
+    # so concurrent regenerates can't both miss each other's code
+    previous_otp = await redis_client.setex_get(f"otp_user:{current_user.id}", 600, otp_code)
+    if previous_otp and previous_otp != otp_code:
+        await redis_client.delete(f"otp:{previous_otp}")
     
     if not success:
          # Fallback error if Redis is down (since strict consistency needed)
@@ -122,7 +191,7 @@ async def get_my_guardians(
         select(GuardianLink).where(
             GuardianLink.user_id == current_user.id,
             GuardianLink.status == "active"
-        )
+        ).options(selectinload(GuardianLink.guardian))
     )
     links = result.scalars().all()
     
@@ -132,9 +201,9 @@ async def get_my_guardians(
         guardian_email = "Unknown"
         
         if link.guardian_id:
-            g_user = await db.get(User, link.guardian_id)
+            g_user = link.guardian
             if g_user:
-                guardian_name = f"{g_user.first_name} {g_user.last_name}"
+                guardian_name = g_user.full_name
                 guardian_email = g_user.email
         
         guardians.append(LinkedGuardianResponse(
@@ -170,6 +239,11 @@ async def revoke_guardian_link(
     await db.delete(link)
     await db.commit()
     
+    if link.guardian_id:
+        await invalidate_guardian_cache(link.guardian_id)
+    await invalidate_guardians(link.user_id)
+    await invalidate_user_stats(link.user_id)
+    
     return {"message": "Guardian connection removed"}
 
 
@@ -190,81 +264,31 @@ async def verify_otp_and_link(
     if current_user.email == data.user_email:
         raise HTTPException(status_code=400, detail="You cannot be your own guardian.")
         
-    # 2. Check Redis Cache for OTP
-    cached_json = redis_client.get(f"otp:{data.otp_code}")
+    # 2. Consume the OTP atomically so concurrent verifies can't both use it
+    cached_user_id = await redis_client.getdel(f"otp:{data.otp_code}")
     
-    if not cached_json:
+    if not cached_user_id:
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
     
-    try:
-        cached_data = json.loads(cached_json)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Cache data corruption")
-        
-    # Check email match
-    if cached_data["email"] != data.user_email:
-        raise HTTPException(status_code=400, detail="OTP matches a different user")
-
     # 3. Find protected user (A)
     # Use ID from cache to be safe
-    protected_user_id = cached_data["user_id"]
+    protected_user_id = int(cached_user_id)
     
-    # 4. CONSTRAINT: Guardian (B) cannot have their own Guardians (C)
-    has_guardians = await db.execute(
-        select(GuardianLink).where(
-            GuardianLink.user_id == current_user.id,
-            GuardianLink.status == 'active'
-        )
-    )
-    if has_guardians.scalars().first():
-        raise HTTPException(
-            status_code=400, 
-            detail="You have guardians protecting you. You cannot be a guardian for others while protected."
-        )
-
-    # 5. CONSTRAINT: Protected User (A) cannot be a Guardian for others (X)
-    is_protecting_others = await db.execute(
-        select(GuardianLink).where(
-            GuardianLink.guardian_id == protected_user_id,
-            GuardianLink.status == 'active'
-        )
-    )
-    if is_protecting_others.scalars().first():
-        raise HTTPException(
-            status_code=400,
-            detail="The user you are trying to protect is already a guardian for someone else. Chains are not allowed."
-        )
-
-    # 6. Check if already linked
-    existing = await db.execute(
-        select(GuardianLink).where(
-            GuardianLink.user_id == protected_user_id,
-            GuardianLink.guardian_id == current_user.id
-        )
-    )
-    if existing.scalar_one_or_none():
-         # Already active, just return success
-         redis_client.delete(f"otp:{data.otp_code}")
-         return {"message": "You are already protecting this user"}
-
-    # 7. Create ACTIVE Link
-    new_link = GuardianLink(
-        user_id=protected_user_id,
-        guardian_id=current_user.id,
-        status="active",
-        verified_at=datetime.utcnow()
-    )
-    
-    db.add(new_link)
-    await db.commit()
-    
-    # 8. Remove from cache (Atomic enough for this use case)
-    redis_client.delete(f"otp:{data.otp_code}")
+    try:
+        response = await _link_guardian(db, current_user, protected_user_id, data.user_email)
+    except HTTPException:
+        # Rejected by a linking check (wrong email, chain, ...): the OTP stays consumed
+        raise
+    except Exception:
+        # Unexpected (e.g. DB) failure: put the OTP back for the rest of its lifetime so it can be retried
+        await _restore_otp(data.otp_code, protected_user_id)
+        raise
     
-    return {
-        "message": f"You are now protecting {data.user_email}",
-        "user_email": data.user_email
-    }
+    await redis_client.delete(f"otp_user:{protected_user_id}")
+    await invalidate_guardian_cache(current_user.id)
+    await invalidate_guardians(protected_user_id)
+    await invalidate_user_stats(protected_user_id)
+    return response
 
 
 @router.get("/my-protected-users", response_model=list[LinkedUserResponse])
@@ -278,17 +302,17 @@ async def get_protected_users(
         select(GuardianLink).where(
             GuardianLink.guardian_id == current_user.id,
             GuardianLink.status == "active"
-        )
+        ).options(selectinload(GuardianLink.user))
     )
     links = result.scalars().all()
     
     users = []
     for link in links:
-        u_user = await db.get(User, link.user_id)
+        u_user = link.user
         if u_user:
             users.append(LinkedUserResponse(
                 user_id=u_user.id,
-                user_name=f"{u_user.first_name} {u_user.last_name}",
+                user_name=u_user.full_name,
                 user_email=u_user.email,
                 status=link.status,
                 linked_at=link.verified_at
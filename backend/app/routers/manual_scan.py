@@ -2,22 +2,25 @@
 Manual Scan API
 Unified endpoint for manual fact-checking: text, URLs, phone numbers, images
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional, Literal
 from app.db import get_db
-from app.models import User, Scan, TrustedSender, Blacklist, PlatformType, RiskLevel
+from app.models import User, Scan, Blacklist, PlatformType, RiskLevel
 from app.routers.auth import get_current_user
 from app.services.scam_detector import ScamDetector
 from app.services.url_scraper import url_scraper
 from app.services.explanation_engine import explanation_engine
 from app.services.confidence_scorer import confidence_scorer
 from app.services.blacklist_manager import blacklist_manager
+from app.core import sender_cache
+from app.core import stats_cache
+import asyncio
 import hashlib
 import re
+import orjson
 
 router = APIRouter()
 detector = ScamDetector()
@@ -54,25 +57,31 @@ class ExplanationRequest(BaseModel):
 
 # ============== Helper Functions ==============
 
+# Compiled once; detect_content_type runs on every /analyze call
+_URL_RE = re.compile(r'^(https?://|www\.)[^\s]+', re.IGNORECASE)
+_PHONE_RE = re.compile(r'^[\+]?[0-9]{10,13}$')  # Indian format
+_DOMAIN_RE = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9-]*\.[a-zA-Z]{2,}$')
+_STRIP_RE = re.compile(r'[^\d+]')
+
+
 def detect_content_type(content: str) -> str:
     """Auto-detect content type from input"""
     
     content = content.strip()
     
+    # Cheap string checks first so plain text (most traffic) skips the regexes;
+    # each guard is implied by its pattern, so results are unchanged
+    
     # Check for URL
-    url_pattern = r'^(https?://|www\.)[^\s]+'
-    if re.match(url_pattern, content, re.IGNORECASE):
+    if content[:8].lower().startswith(("http://", "https://", "www.")) and _URL_RE.match(content):
         return "url"
     
-    # Check for phone number (Indian format)
-    phone_pattern = r'^[\+]?[0-9]{10,13}$'
-    digits_only = re.sub(r'[^\d+]', '', content)
-    if re.match(phone_pattern, digits_only):
+    # Check for phone number (needs at least 10 digits)
+    if len(content) >= 10 and _PHONE_RE.match(_STRIP_RE.sub('', content)):
         return "phone"
     
     # Check if it's a domain
-    domain_pattern = r'^[a-zA-Z0-9][a-zA-Z0-9-]*\.[a-zA-Z]{2,}$'
-    if re.match(domain_pattern, content):
+    if "." in content and " " not in content and _DOMAIN_RE.match(content):
         return "url"
     
     return "text"
@@ -81,15 +90,32 @@ def detect_content_type(content: str) -> str:
 # Helper function check_reputation removed - replaced by blacklist_manager.check_blacklist
 
 
-async def check_trusted(sender: str, user_id: int, db: AsyncSession) -> bool:
-    """Check if sender is trusted by user"""
-    result = await db.execute(
-        select(TrustedSender).where(
-            TrustedSender.user_id == user_id,
-            TrustedSender.sender == sender
-        )
-    )
-    return result.scalar_one_or_none() is not None
+async def auto_blacklist_in_background(content: str, content_type: str, result: dict, confidence: float, user_consented: bool):
+    """Auto-blacklist a HIGH risk scan after the response is sent (own session; the request's is closed by then)"""
+    from app.db.database import async_session
+    
+    async with async_session() as db:
+        if content_type in ["url", "phone"]:
+            await blacklist_manager.auto_blacklist(
+                value=content,
+                content_type=content_type,
+                source="ai_auto",
+                full_message=content,
+                ai_reasoning=result["reason"],
+                scam_type=result.get("scam_type"),
+                confidence=confidence,
+                user_consented=user_consented,
+                db=db
+            )
+        elif content_type == "text":
+            await blacklist_manager.auto_blacklist_from_message(
+                message=content,
+                ai_reasoning=result["reason"],
+                scam_type=result.get("scam_type"),
+                confidence=confidence,
+                user_consented=user_consented,
+                db=db
+            )
 
 
 # ============== Endpoints ==============
@@ -97,6 +123,7 @@ async def check_trusted(sender: str, user_id: int, db: AsyncSession) -> bool:
 @router.post("/analyze", response_model=ManualScanResult)
 async def manual_scan(
     request: ManualScanRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -114,27 +141,15 @@ async def manual_scan(
     if content_type == "auto":
         content_type = detect_content_type(content)
     
-    # Check reputation database (Cached)
-    reputation = await blacklist_manager.check_blacklist(content, content_type, db)
-    
-    # Check if trusted (for phone numbers as "sender")
     is_trusted = False
-    if content_type == "phone":
-        is_trusted = await check_trusted(content, current_user.id, db)
     
-    # Run appropriate analysis
-    if content_type == "url":
-        # URL analysis
-        url_result = await url_scraper.analyze_url(content)
+    if content_type == "phone":
+        # Check reputation database (Cached)
+        reputation = await blacklist_manager.check_blacklist(content, content_type, db)
         
-        result = {
-            "risk_level": url_result["risk_level"],
-            "reason": url_result["reason"],
-            "confidence": url_result.get("confidence", 0.7),
-            "scam_type": url_result.get("scam_type", "Suspicious URL" if url_result["risk_level"] == "HIGH" else None)
-        }
+        # Check if trusted (for phone numbers as "sender")
+        is_trusted = await sender_cache.is_trusted(db, current_user.id, content)
         
-    elif content_type == "phone":
         # Phone number analysis - check reputation
         if reputation["is_blacklisted"]:
             result = {
@@ -157,11 +172,29 @@ async def manual_scan(
                 "confidence": 0.6,
                 "scam_type": None
             }
-            
+    
     else:
-        # Text analysis using AI
-        detection_result = await detector.analyze(content, "Manual Check")
-        result = detection_result
+        # URL fetch / AI call doesn't touch the DB, so overlap it with the reputation lookup
+        if content_type == "url":
+            analysis = url_scraper.analyze_url(content)
+        else:
+            # Text analysis using AI
+            analysis = detector.analyze(content, "Manual Check")
+        
+        reputation, analysis_result = await asyncio.gather(
+            blacklist_manager.check_blacklist(content, content_type, db),
+            analysis
+        )
+        
+        if content_type == "url":
+            result = {
+                "risk_level": analysis_result["risk_level"],
+                "reason": analysis_result["reason"],
+                "confidence": analysis_result.get("confidence", 0.7),
+                "scam_type": analysis_result.get("scam_type", "Suspicious URL" if analysis_result["risk_level"] == "HIGH" else None)
+            }
+        else:
+            result = analysis_result
     
     # Apply reputation boost if blacklisted
     if reputation.get("is_blacklisted") and result["risk_level"] != "HIGH":
@@ -186,7 +219,7 @@ async def manual_scan(
         user_id=current_user.id,
         sender=f"Manual:{content_type}",
         message=content,
-        message_preview=content[:200] if len(content) > 200 else content,
+        message_preview=Scan.preview(content),
         platform=PlatformType.SMS,  # Using SMS as general platform
         risk_level=RiskLevel(result["risk_level"]),
         risk_reason=result["reason"],
@@ -197,31 +230,15 @@ async def manual_scan(
     )
     
     db.add(scan)
-    await db.commit()
-    await db.refresh(scan)
+    await db.commit()  # scan.id is populated by the INSERT; no refresh round trip needed
+    await stats_cache.invalidate_user_stats(current_user.id)
     
-    # Auto-blacklist HIGH confidence scams
+    # Auto-blacklist HIGH confidence scams (off the response path)
     if result["risk_level"] == "HIGH" and calibrated["confidence"] >= 0.70:
-        if content_type in ["url", "phone"]:
-            await blacklist_manager.auto_blacklist(
-                value=content,
-                content_type=content_type,
-                full_message=content,
-                ai_reasoning=result["reason"],
-                scam_type=result.get("scam_type"),
-                confidence=calibrated["confidence"],
-                user_consented=current_user.consent_training_data,
-                db=db
-            )
-        elif content_type == "text":
-            await blacklist_manager.auto_blacklist_from_message(
-                message=content,
-                ai_reasoning=result["reason"],
-                scam_type=result.get("scam_type"),
-                confidence=calibrated["confidence"],
-                user_consented=current_user.consent_training_data,
-                db=db
-            )
+        background_tasks.add_task(
+            auto_blacklist_in_background,
+            content, content_type, result, calibrated["confidence"], current_user.consent_training_data
+        )
     
     return ManualScanResult(
         content=content,
@@ -261,16 +278,9 @@ async def get_explanation(
     }
 
 
-@router.get("/scam-types")
-async def list_scam_types(
-    current_user: User = Depends(get_current_user)
-):
-    """Get list of all known scam types with brief descriptions"""
-    
-    all_types = explanation_engine.get_all_scam_types()
-    
+def _build_scam_types() -> list:
     result = []
-    for scam_type in all_types:
+    for scam_type in explanation_engine.get_all_scam_types():
         explanation = explanation_engine.get_explanation("HIGH", scam_type)
         result.append({
             "type": scam_type,
@@ -278,10 +288,21 @@ async def list_scam_types(
             "severity": explanation["severity"],
             "potential_loss": explanation["potential_loss"]
         })
-    
     return result
 
 
+# Built from static explanation data, so serialize once at import
+_SCAM_TYPES_JSON = orjson.dumps(_build_scam_types())
+
+
+@router.get("/scam-types")
+async def list_scam_types(
+    current_user: User = Depends(get_current_user)
+):
+    """Get list of all known scam types with brief descriptions"""
+    return Response(content=_SCAM_TYPES_JSON, media_type="application/json")
+
+
 @router.post("/analyze-url")
 async def analyze_url_only(
     url: str,
@@ -323,7 +344,7 @@ async def check_phone_only(
     reputation = await blacklist_manager.check_blacklist(normalized, "phone", db)
     
     # Check if trusted
-    is_trusted = await check_trusted(normalized, current_user.id, db)
+    is_trusted = await sender_cache.is_trusted(db, current_user.id, normalized)
     
     if reputation["is_blacklisted"]:
         risk_level = "HIGH"
@@ -2,16 +2,19 @@
 Privacy & Consent Management API
 Handles user consent, GDPR rights, and data protection controls
 """
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from app.db import get_db
-from app.models import User, UserSettings, ConsentLog, Blacklist, Scan
+from app.models import User, UserSettings, ConsentLog, Blacklist, Scan, RiskLevel
 from app.routers.auth import get_current_user
-import json
+from app.services.audit_buffer import audit_buffer
+from app.services.account_purge import purge_user_in_background
+import orjson
 
 router = APIRouter()
 
@@ -43,11 +46,11 @@ async def log_consent_change(
     consent_type: str,
     consent_given: bool,
     version: str,
-    ip_address: str,
+    ip_address: Optional[str],
     db: AsyncSession
 ):
-    """Log consent change to audit trail"""
-    log = ConsentLog(
+    """Log consent change to audit trail and commit the caller's changes"""
+    row = dict(
         user_id=user_id,
         consent_type=consent_type,
         consent_given=consent_given,
@@ -55,8 +58,13 @@ async def log_consent_change(
         ip_address=ip_address,
         created_at=datetime.utcnow()
     )
-    db.add(log)
-    await db.commit()
+    if audit_buffer.running:
+        await db.commit()
+        # Batched insert by the background flusher, queued only once the change is committed
+        audit_buffer.log(**row)
+    else:
+        db.add(ConsentLog(**row))
+        await db.commit()
 
 # ============== Endpoints ==============
 
@@ -75,6 +83,7 @@ async def get_consent_status(
 @router.post("/consent/training-data")
 async def set_training_data_consent(
     update_data: ConsentUpdate,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -91,7 +100,7 @@ async def set_training_data_consent(
         consent_type="training_data",
         consent_given=update_data.consent,
         version=update_data.version,
-        ip_address="127.0.0.1",  # In real app, extract from request
+        ip_address=request.client.host if request.client else None,
         db=db
     )
     
@@ -107,6 +116,7 @@ async def set_training_data_consent(
 @router.post("/consent/analytics")
 async def set_analytics_consent(
     update_data: ConsentUpdate,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -121,7 +131,7 @@ async def set_analytics_consent(
         consent_type="analytics",
         consent_given=update_data.consent,
         version=update_data.version,
-        ip_address="127.0.0.1",
+        ip_address=request.client.host if request.client else None,
         db=db
     )
     
@@ -130,7 +140,7 @@ async def set_analytics_consent(
         "status": current_user.consent_analytics
     }
 
-@router.post("/gdpr/export-data", response_model=DataExportResponse)
+@router.post("/gdpr/export-data", response_class=StreamingResponse, responses={200: {"model": DataExportResponse}})
 async def export_user_data(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -143,52 +153,71 @@ async def export_user_data(
     )
     settings = settings_result.scalar_one_or_none()
     
-    # 2. Fetch consent history
-    history_result = await db.execute(
-        select(ConsentLog).where(ConsentLog.user_id == current_user.id).order_by(ConsentLog.created_at.desc())
-    )
-    history = history_result.scalars().all()
-    
-    # 3. Get generic stats
-    # (Implementation simplified for brevity)
-    
-    response_data = {
-        "user_profile": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "name": f"{current_user.first_name} {current_user.last_name}",
-            "created_at": current_user.created_at
-        },
-        "settings": {
-            "language": settings.language if settings else "en",
-            "auto_block": settings.auto_block_high_risk if settings else True
-        },
-        "consent_history": [
-            {
-                "type": log.consent_type,
-                "given": log.consent_given,
-                "date": log.created_at,
-                "version": log.consent_version
-            } for log in history
-        ],
-        "scan_history_summary": {
-            "total_scans": 0, # Fetch real count
-            "scams_detected": 0
-        },
-        "contributed_blacklist_entries": 0, # Fetch real count
-        "generated_at": datetime.utcnow()
+    user_profile = {
+        "id": current_user.id,
+        "email": current_user.email,
+        "name": current_user.full_name,
+        "created_at": current_user.created_at
+    }
+    user_settings = {
+        "language": settings.language if settings else "en",
+        "auto_block": settings.auto_block_high_risk if settings else True
     }
     
+    # 2. Scan counts in one aggregate pass
+    scan_counts = (await db.execute(
+        select(
+            func.count(Scan.id),
+            func.count(Scan.id).filter(Scan.risk_level == RiskLevel.HIGH)
+        ).where(Scan.user_id == current_user.id)
+    )).one()
+    
     # Log the export request
     if settings:
         settings.data_export_requested = True
         await db.commit()
     
-    return response_data
+    async def generate():
+        yield b'{"user_profile":' + orjson.dumps(user_profile)
+        yield b',"settings":' + orjson.dumps(user_settings)
+        
+        # 3. Stream consent history straight from the cursor so memory stays flat
+        yield b',"consent_history":['
+        history = await db.stream(
+            select(
+                ConsentLog.consent_type,
+                ConsentLog.consent_given,
+                ConsentLog.created_at,
+                ConsentLog.consent_version
+            )
+            .where(ConsentLog.user_id == current_user.id)
+            .order_by(ConsentLog.created_at.desc())
+            .execution_options(yield_per=500)
+        )
+        separator = b""
+        async for log in history:
+            yield separator + orjson.dumps({
+                "type": log.consent_type,
+                "given": log.consent_given,
+                "date": log.created_at,
+                "version": log.consent_version
+            })
+            separator = b","
+        
+        yield b'],"scan_history_summary":' + orjson.dumps({
+            "total_scans": scan_counts[0],
+            "scams_detected": scan_counts[1]
+        })
+        # Blacklist entries aren't linked to a contributing user yet
+        yield b',"contributed_blacklist_entries":0'
+        yield b',"generated_at":' + orjson.dumps(datetime.utcnow()) + b"}"
+    
+    return StreamingResponse(generate(), media_type="application/json")
 
 @router.post("/gdpr/delete-account")
 async def delete_account(
     request: DeletionRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -203,9 +232,12 @@ async def delete_account(
     # 1. Anonymize contributions before deleting user
     # (In a real app, you'd run a robust anonymization query here)
     
-    # 2. Delete user
-    await db.delete(current_user)
+    # 2. Soft-delete now (the account stops authenticating immediately),
+    #    then purge the user and their history in chunks after the response
+    current_user.is_active = False
+    current_user.deleted_at = datetime.utcnow()
     await db.commit()
+    background_tasks.add_task(purge_user_in_background, db.bind, current_user.id)
     
     return {"message": "Account scheduled for permanent deletion"}
 
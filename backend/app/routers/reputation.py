@@ -3,17 +3,22 @@ Reputation Database API
 Check and report scam URLs, phone numbers, and domains
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
 from pydantic import BaseModel
+import csv
 import hashlib
-import re
+import io
+import orjson
 from urllib.parse import urlparse
 from app.db import get_db
 from app.models import User, Blacklist
 from app.routers.auth import get_current_user
-from app.services.blacklist_manager import blacklist_manager
+from app.services.blacklist_manager import blacklist_manager, strip_non_phone_chars
 
 router = APIRouter()
 
@@ -49,14 +54,24 @@ class BlacklistEntry(BaseModel):
         from_attributes = True
 
 
+# Only the BlacklistEntry fields; skips message text, reasoning and other training columns
+_BLACKLIST_ENTRY_COLUMNS = [getattr(Blacklist, field) for field in BlacklistEntry.model_fields]
+
+
 # ============== Helper Functions ==============
 
+# risk_score = round(min(base + reports_count * 0.05, 1.0), 2); every base reaches 1.0 by the cap
+_RISK_SCORE_CAP = 10
+_RISK_SCORES_VERIFIED = tuple(round(min(0.9 + n * 0.05, 1.0), 2) for n in range(_RISK_SCORE_CAP + 1))
+_RISK_SCORES_UNVERIFIED = tuple(round(min(0.5 + n * 0.05, 1.0), 2) for n in range(_RISK_SCORE_CAP + 1))
+
+
 def normalize_value(value: str, value_type: str) -> str:
     """Normalize value for consistent storage and lookup"""
     
     if value_type == "phone":
         # Remove all non-digits, keep + at start
-        digits = re.sub(r'[^\d+]', '', value)
+        digits = strip_non_phone_chars(value)
         # If starts with +91, keep it, otherwise add +91 for India
         if not digits.startswith('+'):
             if digits.startswith('91') and len(digits) == 12:
@@ -68,8 +83,12 @@ def normalize_value(value: str, value_type: str) -> str:
     elif value_type == "url":
         # Remove protocol, lowercase, remove trailing slash
         value = value.lower().strip()
-        value = re.sub(r'^https?://', '', value)
-        value = re.sub(r'/$', '', value)
+        if value.startswith('https://'):
+            value = value[8:]
+        elif value.startswith('http://'):
+            value = value[7:]
+        if value.endswith('/'):
+            value = value[:-1]
         return value
     
     elif value_type == "domain":
@@ -84,8 +103,8 @@ def normalize_value(value: str, value_type: str) -> str:
 
 
 def compute_hash(value: str) -> str:
-    """Compute SHA256 hash of normalized value"""
-    return hashlib.sha256(value.encode()).hexdigest()
+    """Compute 128-bit BLAKE2b hash of normalized value (must match BlacklistManager.compute_hash)"""
+    return hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
 
 
 # ============== Endpoints ==============
@@ -113,33 +132,20 @@ async def check_reputation(
     else:
         raise HTTPException(status_code=400, detail="Provide url, phone, or domain parameter")
     
-    # Normalize and hash
-    normalized = normalize_value(value, value_type)
-    value_hash = compute_hash(normalized)
+    # Shared Redis-cached lookup (same key /report invalidates)
+    entry = await blacklist_manager.check_blacklist(value, value_type, db)
     
-    # Look up in database
-    result = await db.execute(
-        select(Blacklist).where(
-            Blacklist.value_hash == value_hash,
-            Blacklist.type == value_type
-        )
-    )
-    entry = result.scalar_one_or_none()
-    
-    if entry:
-        # Calculate risk score based on reports and verification
-        base_score = 0.5
-        if entry.is_verified:
-            base_score = 0.9
-        score = min(base_score + (entry.reports_count * 0.05), 1.0)
+    if entry["is_blacklisted"]:
+        # Risk score based on reports and verification (precomputed table)
+        scores = _RISK_SCORES_VERIFIED if entry["is_verified"] else _RISK_SCORES_UNVERIFIED
         
         return ReputationCheck(
             value=value,
             type=value_type,
             is_blacklisted=True,
-            reports_count=entry.reports_count,
-            is_verified=entry.is_verified,
-            risk_score=round(score, 2)
+            reports_count=entry["reports_count"],
+            is_verified=entry["is_verified"],
+            risk_score=scores[min(entry["reports_count"], _RISK_SCORE_CAP)]
         )
     
     return ReputationCheck(
@@ -168,38 +174,39 @@ async def report_scam(
     normalized = normalize_value(report.value, report.type)
     value_hash = compute_hash(normalized)
     
-    # Check if already exists
-    result = await db.execute(
-        select(Blacklist).where(
-            Blacklist.value_hash == value_hash,
-            Blacklist.type == report.type
+    # Insert or bump the count in one atomic statement (no select-then-write race)
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    stmt = (
+        dialect_insert(Blacklist)
+        .values(
+            type=report.type,
+            value=normalized,
+            value_hash=value_hash,
+            source="community",
+            reports_count=1,
+            first_reported_at=now,
+            last_reported_at=now
         )
+        .on_conflict_do_update(
+            index_elements=["type", "value_hash"],
+            set_={
+                "reports_count": Blacklist.reports_count + 1,
+                "last_reported_at": now
+            }
+        )
+        .returning(Blacklist.reports_count)
     )
-    existing = result.scalar_one_or_none()
+    reports_count = (await db.execute(stmt)).scalar_one()
+    await db.commit()
+    await blacklist_manager.invalidate(report.type, value_hash)
     
-    if existing:
-        # Increment report count
-        existing.reports_count += 1
-        existing.last_reported_at = datetime.utcnow()
-        await db.commit()
-        
+    if reports_count > 1:
         return {
             "message": "Report added to existing entry",
-            "reports_count": existing.reports_count
+            "reports_count": reports_count
         }
     
-    # Create new entry
-    entry = Blacklist(
-        type=report.type,
-        value=normalized,
-        value_hash=value_hash,
-        source="community",
-        reports_count=1
-    )
-    
-    db.add(entry)
-    await db.commit()
-    
     return {"message": "Scam reported successfully", "reports_count": 1}
 
 
@@ -212,7 +219,7 @@ async def get_recent_reports(
 ):
     """Get recently reported scams"""
     
-    query = select(Blacklist).order_by(Blacklist.last_reported_at.desc())
+    query = select(*_BLACKLIST_ENTRY_COLUMNS).order_by(Blacklist.last_reported_at.desc())
     
     if type:
         if type not in ["url", "phone", "domain"]:
@@ -222,7 +229,7 @@ async def get_recent_reports(
     query = query.limit(limit)
     
     result = await db.execute(query)
-    return result.scalars().all()
+    return result.all()
 
 
 @router.get("/verified", response_model=list[BlacklistEntry])
@@ -234,12 +241,12 @@ async def get_verified_scams(
     """Get verified scam entries (high confidence)"""
     
     result = await db.execute(
-        select(Blacklist)
+        select(*_BLACKLIST_ENTRY_COLUMNS)
         .where(Blacklist.is_verified == True)
         .order_by(Blacklist.reports_count.desc())
         .limit(limit)
     )
-    return result.scalars().all()
+    return result.all()
 
 
 @router.get("/export/training-data")
@@ -252,28 +259,39 @@ async def export_training_data(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Export blacklist data in LLM training format
+    Export blacklist data in LLM training format, streamed row by row
     
     Formats:
-    - jsonl: OpenAI fine-tuning format
+    - jsonl: OpenAI fine-tuning format, one JSON record per line
     - csv: Tabular data format
     """
     
     if format not in ["jsonl", "csv"]:
         raise HTTPException(status_code=400, detail="Format must be 'jsonl' or 'csv'")
     
-    training_data = await blacklist_manager.export_training_data(
-        db=db,
-        format=format,
+    query = blacklist_manager.training_data_query(
         min_confidence=min_confidence,
         verified_only=verified_only,
         limit=limit
     )
     
-    return {
-        "format": format,
-        "total_entries": len(training_data),
-        "min_confidence": min_confidence,
-        "verified_only": verified_only,
-        "data": training_data
-    }
+    async def generate():
+        rows = await db.stream(query.execution_options(yield_per=500))
+        
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=blacklist_manager.TRAINING_CSV_FIELDS)
+            writer.writeheader()
+            async for entry in rows.scalars():
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow(blacklist_manager.to_training_record(entry, format))
+            yield buffer.getvalue().encode()
+            return
+        
+        async for entry in rows.scalars():
+            yield orjson.dumps(blacklist_manager.to_training_record(entry, format)) + b"\n"
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
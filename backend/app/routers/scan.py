@@ -1,23 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, tuple_
 from datetime import datetime
-from app.db import get_db
+import aiofiles
+import orjson
+import os
+import time
+import logging
+from app.db import get_db, commit_without_flush_wait
 from app.models import User, Scan, RiskLevel, PlatformType
 from app.routers.auth import get_current_user
 from app.schemas import ScanRequest, ScanResponse, ScanDetail
 from app.services.scam_detector import ScamDetector
 from app.services.confidence_scorer import confidence_scorer
 from app.services.explanation_engine import explanation_engine
-from app.services.guardian_alert_service import guardian_alert_service
+from app.services.guardian_alert_service import send_guardian_alerts
+from app.services import sender_blocklist
+from app.core import sender_cache
+from app.core import stats_cache
+from app.core.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
 detector = ScamDetector()
+logger = logging.getLogger(__name__)
+
+# Screenshot uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Columns of ScanResponse, in field order
+_SCAN_RESPONSE_COLUMNS = [getattr(Scan, field) for field in ScanResponse.model_fields]
 
 
 @router.post("/analyze", response_model=ScanResponse)
 async def analyze_message(
     request: ScanRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -31,7 +48,7 @@ async def analyze_message(
         user_id=current_user.id,
         sender=request.sender,
         message=request.message,
-        message_preview=request.message[:200] if len(request.message) > 200 else request.message,
+        message_preview=Scan.preview(request.message),
         platform=request.platform,
         risk_level=RiskLevel(result["risk_level"]),
         risk_reason=result["reason"],
@@ -41,18 +58,19 @@ async def analyze_message(
     )
     
     db.add(scan)
-    await db.commit()
-    await db.refresh(scan)
+    await commit_without_flush_wait(db)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
-    # Send alert to guardians if HIGH risk
+    # Send alert to guardians if HIGH risk (in background)
     if result["risk_level"] == "HIGH":
-        await guardian_alert_service.create_alerts_for_scan(scan, db)
+        background_tasks.add_task(send_guardian_alerts, current_user.id, scan.id)
     
     return scan
 
 
 @router.post("/analyze-image", response_model=ScanResponse)
 async def analyze_image(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     sender: str = Form("Manual Check"),
     platform: str = Form("WHATSAPP"),
@@ -67,27 +85,26 @@ async def analyze_image(
     except ValueError:
         p_type = PlatformType.WHATSAPP
         
-    print(f"DEBUG: Endpoint /analyze-image called by user {current_user.email} for {p_type}")
-    contents = await file.read()
-    print(f"DEBUG: File size read: {len(contents)} bytes")
+    logger.debug("/analyze-image called by user %s for %s", current_user.email, p_type)
+    
+    # Stream the upload to disk in chunks rather than reading it all into memory
+    filename = f"scan_{int(time.time())}_{file.filename}"
+    file_path = os.path.join("app", "static", "uploads", filename)
+    size = 0
+    async with aiofiles.open(file_path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await out.write(chunk)
+            size += len(chunk)
+    logger.debug("File size written: %d bytes", size)
     
     try:
-        result = await detector.analyze_image(contents)
-        print(f"DEBUG: Detector Result: {result}")
+        result = await detector.analyze_image(file_path)
+        logger.debug("Detector result: %s", result)
     except Exception as e:
-        print(f"DEBUG: Detector Exception: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Image detector failed")
+        os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Detector failed: {str(e)}")
     
-    # Save image to disk
-    import os
-    import time
-    filename = f"scan_{int(time.time())}_{file.filename}"
-    file_path = os.path.join("app", "static", "uploads", filename)
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
     image_url = f"/api/uploads/{filename}"
     
     # Create scan record
@@ -107,19 +124,16 @@ async def analyze_image(
         
         db.add(scan)
         await db.commit()
-        await db.refresh(scan)
-        print(f"DEBUG: Scan record created with ID: {scan.id}")
+        await stats_cache.invalidate_user_stats(current_user.id)
+        logger.debug("Scan record created with ID: %s", scan.id)
     except Exception as e:
-        print(f"DEBUG: Database Save Failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Saving image scan failed")
         raise HTTPException(status_code=500, detail=f"Database failed: {str(e)}")
     
-    # Send alert if HIGH risk (simplified logic here)
+    # Send alert to guardians if HIGH risk (in background)
     if scan.risk_level == RiskLevel.HIGH:
-        # TODO: Implement alerts for image scams (same as text)
-        pass # Alert logic omitted for brevity in this insertion, but should reuse existing logic
-        
+        background_tasks.add_task(send_guardian_alerts, current_user.id, scan.id)
+    
     return scan
 
 
@@ -127,20 +141,40 @@ async def analyze_image(
 async def get_history(
     limit: int = 50,
     risk_level: RiskLevel | None = None,
+    before: str | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get scan history for current user"""
+    """
+    Get scan history for current user.
+    Pages by keyset: pass the X-Next-Cursor header from the previous page
+    as `before` to get the next `limit` older scans.
+    """
     
-    query = select(Scan).where(Scan.user_id == current_user.id)
+    # Project just the ScanResponse columns and serialize them directly:
+    # no ORM hydration and no per-row Pydantic validation on this hot list
+    query = select(*_SCAN_RESPONSE_COLUMNS).where(Scan.user_id == current_user.id)
     
     if risk_level:
         query = query.where(Scan.risk_level == risk_level)
+    if before is not None:
+        query = query.where(tuple_(Scan.created_at, Scan.id) < decode_cursor(before))
     
-    query = query.order_by(Scan.created_at.desc()).limit(limit)
+    query = query.order_by(Scan.created_at.desc(), Scan.id.desc()).limit(limit)
     
     result = await db.execute(query)
-    return result.scalars().all()
+    rows = [row._asdict() for row in result.all()]
+    
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    # Naive datetimes are stored as UTC; serialize them with a Z like ScanResponse does
+    return Response(
+        content=orjson.dumps(rows, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z),
+        media_type="application/json",
+        headers=headers
+    )
 
 
 @router.get("/{scan_id}", response_model=ScanDetail)
@@ -170,16 +204,18 @@ async def delete_scan(
 ):
     """Delete a scan"""
     
+    # Ownership check and delete in one statement
     result = await db.execute(
-        select(Scan).where(Scan.id == scan_id, Scan.user_id == current_user.id)
+        delete(Scan)
+        .where(Scan.id == scan_id, Scan.user_id == current_user.id)
+        .returning(Scan.id)
     )
-    scan = result.scalar_one_or_none()
     
-    if not scan:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    await db.delete(scan)
     await db.commit()
+    await stats_cache.invalidate_user_stats(current_user.id)
     
     return {"message": "Scan deleted"}
 
@@ -192,15 +228,16 @@ async def block_sender(
 ):
     """Mark a sender as blocked"""
     
-    result = await db.execute(
-        select(Scan).where(Scan.id == scan_id, Scan.user_id == current_user.id)
+    sender = await db.scalar(
+        select(Scan.sender).where(Scan.id == scan_id, Scan.user_id == current_user.id)
     )
-    scan = result.scalar_one_or_none()
     
-    if not scan:
+    if sender is None:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    scan.is_blocked = True
+    await sender_blocklist.block_sender(db, current_user.id, sender, reason="Blocked from scan history")
     await db.commit()
+    await sender_cache.invalidate_blocked(current_user.id, sender)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
-    return {"message": f"Sender {scan.sender} blocked"}
+    return {"message": f"Sender {sender} blocked"}
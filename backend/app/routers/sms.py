@@ -1,18 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from datetime import datetime, timedelta
+import asyncio
 from pydantic import BaseModel
-from app.db import get_db
+from app.db import get_db, commit_without_flush_wait
 from app.models import User, Scan, RiskLevel, PlatformType
 from app.routers.auth import get_current_user
 from app.services.scam_detector import ScamDetector
 from app.services.guardian_alert_service import send_guardian_alerts
 from app.services.blacklist_manager import blacklist_manager
+from app.services import sender_blocklist
+from app.core import sender_cache
+from app.core import stats_cache
+from app.core.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
 detector = ScamDetector()
 
+# Max detector calls in flight per /analyze-batch request
+BATCH_ANALYZE_CONCURRENCY = 10
+
+# Detection result used for messages from the user's trusted senders
+TRUSTED_SENDER_RESULT = {
+    "risk_level": "LOW",
+    "reason": "Sender is in your trusted list",
+    "scam_type": None,
+    "confidence": 1.0
+}
+
 
 # ============== SMS-Specific Schemas ==============
 
@@ -58,6 +74,20 @@ class SMSStats(BaseModel):
     last_scan: datetime | None
 
 
+# Scan columns behind each SMSAnalysisResult field
+_SMS_RESULT_COLUMNS = [
+    Scan.sender,
+    Scan.message_preview,
+    Scan.risk_level,
+    Scan.risk_reason.label("reason"),
+    Scan.scam_type,
+    Scan.confidence,
+    Scan.is_blocked,
+    Scan.guardian_alerted,
+    Scan.id.label("scan_id"),
+]
+
+
 # ============== SMS Endpoints ==============
 
 @router.post("/analyze", response_model=SMSAnalysisResult)
@@ -72,15 +102,8 @@ async def analyze_sms(
     This is the main endpoint called when a new SMS arrives.
     """
     
-    # Check if sender is already blocked
-    blocked_result = await db.execute(
-        select(Scan).where(
-            Scan.user_id == current_user.id,
-            Scan.sender == sms.sender,
-            Scan.is_blocked == True
-        ).limit(1)
-    )
-    is_blocked = blocked_result.scalar_one_or_none() is not None
+    # Blocked / trusted status of the sender, looked up together
+    is_blocked, trusted = await sender_cache.lookup_sender(db, current_user.id, sms.sender)
     
     # If blocked, return HIGH risk immediately without AI call
     if is_blocked:
@@ -89,7 +112,7 @@ async def analyze_sms(
             user_id=current_user.id,
             sender=sms.sender,
             message=sms.message,
-            message_preview=sms.message[:200] if len(sms.message) > 200 else sms.message,
+            message_preview=Scan.preview(sms.message),
             platform=PlatformType.SMS,
             risk_level=RiskLevel.HIGH,
             risk_reason="Sender is on block list",
@@ -99,8 +122,8 @@ async def analyze_sms(
             guardian_alerted=False
         )
         db.add(scan)
-        await db.commit()
-        await db.refresh(scan)
+        await commit_without_flush_wait(db)
+        await stats_cache.invalidate_user_stats(current_user.id)
         
         return SMSAnalysisResult(
             sender=sms.sender,
@@ -114,10 +137,12 @@ async def analyze_sms(
             scan_id=scan.id
         )
     
-    # Run scam detection
-    result = await detector.analyze(sms.message, sms.sender)
+    # Trusted senders skip detection entirely
+    if trusted is not None:
+        result = TRUSTED_SENDER_RESULT
+    else:
+        result = await detector.analyze(sms.message, sms.sender)
     
-    # Create scan record
     # Create scan record
     # SPACE OPTIMIZATION: Do not store full message for LOW risk (Safe) scans
     message_content = sms.message
@@ -128,7 +153,7 @@ async def analyze_sms(
         user_id=current_user.id,
         sender=sms.sender,
         message=message_content,
-        message_preview=sms.message[:200] if len(sms.message) > 200 else sms.message,
+        message_preview=Scan.preview(sms.message),
         platform=PlatformType.SMS,
         risk_level=RiskLevel(result["risk_level"]),
         risk_reason=result["reason"],
@@ -139,15 +164,12 @@ async def analyze_sms(
     )
     
     db.add(scan)
-    await db.commit()
-    await db.refresh(scan)
+    await commit_without_flush_wait(db)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
     # Send alert to guardians if HIGH risk (in background)
     if result["risk_level"] == "HIGH":
-        background_tasks.add_task(
-            send_guardian_alerts,
-            db, current_user, scan, result
-        )
+        background_tasks.add_task(send_guardian_alerts, current_user.id, scan.id)
         
         # Auto-blacklist HIGH confidence scams
         if result["confidence"] >= 0.70:
@@ -191,22 +213,27 @@ async def analyze_sms_batch(
             detail="Maximum 50 messages per batch"
         )
     
-    results = []
+    # Run detection concurrently (simplified, no guardian alerts for batch),
+    # capped so a full batch doesn't flood the model / AI providers
+    trusted = await sender_cache.trusted_among(db, current_user.id, {sms.sender for sms in batch.messages})
     
-    for sms in batch.messages:
-        # Run detection (simplified, no guardian alerts for batch)
-        result = await detector.analyze(sms.message, sms.sender)
-        
-        # SPACE OPTIMIZATION: Do not store full message for LOW risk (Safe) scans
-        message_content = sms.message
-        if result["risk_level"] == "LOW":
-            message_content = None
-
-        scan = Scan(
+    slots = asyncio.Semaphore(BATCH_ANALYZE_CONCURRENCY)
+    
+    async def analyze(sms: SMSMessage) -> dict:
+        if sms.sender in trusted:
+            return TRUSTED_SENDER_RESULT
+        async with slots:
+            return await detector.analyze(sms.message, sms.sender)
+    
+    analyses = await asyncio.gather(*(analyze(sms) for sms in batch.messages))
+    
+    scans = [
+        Scan(
             user_id=current_user.id,
             sender=sms.sender,
-            message=message_content,
-            message_preview=sms.message[:200] if len(sms.message) > 200 else sms.message,
+            # SPACE OPTIMIZATION: Do not store full message for LOW risk (Safe) scans
+            message=None if result["risk_level"] == "LOW" else sms.message,
+            message_preview=Scan.preview(sms.message),
             platform=PlatformType.SMS,
             risk_level=RiskLevel(result["risk_level"]),
             risk_reason=result["reason"],
@@ -215,12 +242,31 @@ async def analyze_sms_batch(
             is_blocked=False,
             guardian_alerted=False
         )
-        
-        db.add(scan)
-        await db.commit()
-        await db.refresh(scan)
-        
-        # Auto-blacklist HIGH confidence scams
+        for sms, result in zip(batch.messages, analyses)
+    ]
+    
+    # One insert round-trip and one commit for the whole batch
+    db.add_all(scans)
+    await db.flush()
+    results = [
+        SMSAnalysisResult(
+            sender=sms.sender,
+            message_preview=scan.message_preview,
+            risk_level=scan.risk_level,
+            reason=result["reason"],
+            scam_type=result.get("scam_type"),
+            confidence=result["confidence"],
+            is_blocked=False,
+            guardian_alerted=False,
+            scan_id=scan.id
+        )
+        for sms, result, scan in zip(batch.messages, analyses, scans)
+    ]
+    await commit_without_flush_wait(db)
+    await stats_cache.invalidate_user_stats(current_user.id)
+    
+    # Auto-blacklist HIGH confidence scams
+    for sms, result in zip(batch.messages, analyses):
         if result["risk_level"] == "HIGH" and result["confidence"] >= 0.70:
             await blacklist_manager.auto_blacklist_from_message(
                 message=sms.message,
@@ -230,18 +276,6 @@ async def analyze_sms_batch(
                 user_consented=current_user.consent_training_data,
                 db=db
             )
-        
-        results.append(SMSAnalysisResult(
-            sender=sms.sender,
-            message_preview=scan.message_preview,
-            risk_level=RiskLevel(result["risk_level"]),
-            reason=result["reason"],
-            scam_type=result.get("scam_type"),
-            confidence=result["confidence"],
-            is_blocked=False,
-            guardian_alerted=False,
-            scan_id=scan.id
-        ))
     
     return results
 
@@ -254,36 +288,10 @@ async def block_sender(
 ):
     """Block a sender from future messages"""
     
-    # Mark all scans from this sender as blocked
-    result = await db.execute(
-        select(Scan).where(
-            Scan.user_id == current_user.id,
-            Scan.sender == sender
-        )
-    )
-    scans = result.scalars().all()
-    
-    for scan in scans:
-        scan.is_blocked = True
-    
-    # If no scans exist, create a placeholder blocked entry
-    if not scans:
-        scan = Scan(
-            user_id=current_user.id,
-            sender=sender,
-            message="[Blocked sender]",
-            message_preview="[Blocked sender]",
-            platform=PlatformType.SMS,
-            risk_level=RiskLevel.HIGH,
-            risk_reason="Manually blocked by user",
-            scam_type="Blocked Sender",
-            confidence=1.0,
-            is_blocked=True,
-            guardian_alerted=False
-        )
-        db.add(scan)
-    
+    await sender_blocklist.block_sender(db, current_user.id, sender, reason="Manually blocked by user")
     await db.commit()
+    await sender_cache.invalidate_blocked(current_user.id, sender)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
     return {"message": f"Sender {sender} has been blocked"}
 
@@ -296,22 +304,12 @@ async def unblock_sender(
 ):
     """Unblock a previously blocked sender"""
     
-    result = await db.execute(
-        select(Scan).where(
-            Scan.user_id == current_user.id,
-            Scan.sender == sender,
-            Scan.is_blocked == True
-        )
-    )
-    scans = result.scalars().all()
-    
-    if not scans:
+    if not await sender_blocklist.unblock_sender(db, current_user.id, sender):
         raise HTTPException(status_code=404, detail="Sender not in block list")
     
-    for scan in scans:
-        scan.is_blocked = False
-    
     await db.commit()
+    await sender_cache.invalidate_blocked(current_user.id, sender)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
     return {"message": f"Sender {sender} has been unblocked"}
 
@@ -323,30 +321,14 @@ async def get_blocked_senders(
 ):
     """Get list of all blocked senders"""
     
-    # Get distinct blocked senders
-    result = await db.execute(
-        select(Scan.sender, Scan.created_at, Scan.risk_reason)
-        .where(
-            Scan.user_id == current_user.id,
-            Scan.is_blocked == True
+    return [
+        BlockedSender(
+            sender=entry.sender,
+            blocked_at=entry.created_at,
+            reason=entry.reason or "Blocked by user"
         )
-        .distinct(Scan.sender)
-        .order_by(Scan.sender, Scan.created_at.desc())
-    )
-    
-    blocked = []
-    seen_senders = set()
-    
-    for row in result:
-        if row.sender not in seen_senders:
-            blocked.append(BlockedSender(
-                sender=row.sender,
-                blocked_at=row.created_at,
-                reason=row.risk_reason or "Blocked by user"
-            ))
-            seen_senders.add(row.sender)
-    
-    return blocked
+        for entry in await sender_blocklist.list_blocked_senders(db, current_user.id)
+    ]
 
 
 @router.get("/stats", response_model=SMSStats)
@@ -356,55 +338,31 @@ async def get_sms_stats(
 ):
     """Get SMS scanning statistics for current user"""
     
-    # Total scans
-    total_result = await db.execute(
-        select(func.count(Scan.id)).where(
+    # Per-risk-level counts and the latest scan time in one pass
+    result = await db.execute(
+        select(Scan.risk_level, func.count(), func.max(Scan.created_at))
+        .where(
             Scan.user_id == current_user.id,
             Scan.platform == PlatformType.SMS
         )
+        .group_by(Scan.risk_level)
     )
-    total = total_result.scalar() or 0
+    counts = {}
+    last_scan = None
+    for risk_level, count, latest in result:
+        counts[risk_level] = count
+        if last_scan is None or latest > last_scan:
+            last_scan = latest
     
-    # High risk count
-    high_result = await db.execute(
-        select(func.count(Scan.id)).where(
-            Scan.user_id == current_user.id,
-            Scan.platform == PlatformType.SMS,
-            Scan.risk_level == RiskLevel.HIGH
-        )
-    )
-    high = high_result.scalar() or 0
-    
-    # Medium risk count
-    medium_result = await db.execute(
-        select(func.count(Scan.id)).where(
-            Scan.user_id == current_user.id,
-            Scan.platform == PlatformType.SMS,
-            Scan.risk_level == RiskLevel.MEDIUM
-        )
-    )
-    medium = medium_result.scalar() or 0
+    total = sum(counts.values())
+    high = counts.get(RiskLevel.HIGH, 0)
+    medium = counts.get(RiskLevel.MEDIUM, 0)
     
     # Low risk count
     low = total - high - medium
     
     # Blocked senders count
-    blocked_result = await db.execute(
-        select(func.count(func.distinct(Scan.sender))).where(
-            Scan.user_id == current_user.id,
-            Scan.is_blocked == True
-        )
-    )
-    blocked = blocked_result.scalar() or 0
-    
-    # Last scan
-    last_result = await db.execute(
-        select(Scan.created_at).where(
-            Scan.user_id == current_user.id,
-            Scan.platform == PlatformType.SMS
-        ).order_by(Scan.created_at.desc()).limit(1)
-    )
-    last_scan = last_result.scalar()
+    blocked = await sender_blocklist.count_blocked_senders(db, current_user.id)
     
     return SMSStats(
         total_scans=total,
@@ -418,40 +376,39 @@ async def get_sms_stats(
 
 @router.get("/recent", response_model=list[SMSAnalysisResult])
 async def get_recent_sms(
+    response: Response,
     limit: int = 20,
     high_risk_only: bool = False,
+    before: str | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get recent SMS scans"""
+    """
+    Get recent SMS scans.
+    Pages by keyset: pass the X-Next-Cursor header from the previous page
+    as `before` to get the next `limit` older scans.
+    """
     
-    query = select(Scan).where(
+    # Only the response columns (labelled as SMSAnalysisResult fields), not the full message text
+    query = select(*_SMS_RESULT_COLUMNS, Scan.created_at).where(
         Scan.user_id == current_user.id,
         Scan.platform == PlatformType.SMS
     )
     
     if high_risk_only:
         query = query.where(Scan.risk_level == RiskLevel.HIGH)
+    if before is not None:
+        query = query.where(tuple_(Scan.created_at, Scan.id) < decode_cursor(before))
     
-    query = query.order_by(Scan.created_at.desc()).limit(limit)
+    query = query.order_by(Scan.created_at.desc(), Scan.id.desc()).limit(limit)
     
     result = await db.execute(query)
-    scans = result.scalars().all()
+    rows = result.all()
     
-    return [
-        SMSAnalysisResult(
-            sender=scan.sender,
-            message_preview=scan.message_preview,
-            risk_level=scan.risk_level,
-            reason=scan.risk_reason,
-            scam_type=scan.scam_type,
-            confidence=scan.confidence,
-            is_blocked=scan.is_blocked,
-            guardian_alerted=scan.guardian_alerted,
-            scan_id=scan.id
-        )
-        for scan in scans
-    ]
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].scan_id)
+    
+    return [SMSAnalysisResult.model_validate(row._mapping) for row in rows]
 
 
 # ============== Helper Functions ==============
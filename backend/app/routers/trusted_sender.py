@@ -5,11 +5,15 @@ Mark senders as trusted to bypass scam alerts
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
 from pydantic import BaseModel
 from app.db import get_db
 from app.models import User, TrustedSender
 from app.routers.auth import get_current_user
+from app.core import sender_cache
+from app.core import stats_cache
 
 router = APIRouter()
 
@@ -57,26 +61,26 @@ async def add_trusted_sender(
 ):
     """Mark a sender as trusted"""
     
-    # Check if already trusted
-    existing = await db.execute(
-        select(TrustedSender).where(
-            TrustedSender.user_id == current_user.id,
-            TrustedSender.sender == data.sender
+    # The unique (user_id, sender) index makes this atomic: no row back means already trusted
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    trusted = await db.scalar(
+        dialect_insert(TrustedSender)
+        .values(
+            user_id=current_user.id,
+            sender=data.sender,
+            name=data.name,
+            reason=data.reason
         )
+        .on_conflict_do_nothing(index_elements=["user_id", "sender"])
+        .returning(TrustedSender)
     )
-    if existing.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Sender already trusted")
     
-    trusted = TrustedSender(
-        user_id=current_user.id,
-        sender=data.sender,
-        name=data.name,
-        reason=data.reason
-    )
+    if trusted is None:
+        raise HTTPException(status_code=400, detail="Sender already trusted")
     
-    db.add(trusted)
     await db.commit()
-    await db.refresh(trusted)
+    await sender_cache.invalidate_trusted(current_user.id, data.sender)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
     return trusted
 
@@ -102,6 +106,8 @@ async def remove_trusted_sender(
     
     await db.delete(trusted)
     await db.commit()
+    await sender_cache.invalidate_trusted(current_user.id, sender)
+    await stats_cache.invalidate_user_stats(current_user.id)
     
     return {"message": f"Sender {sender} removed from trusted list"}
 
@@ -114,16 +120,10 @@ async def check_if_trusted(
 ):
     """Check if a sender is trusted"""
     
-    result = await db.execute(
-        select(TrustedSender).where(
-            TrustedSender.user_id == current_user.id,
-            TrustedSender.sender == sender
-        )
-    )
-    trusted = result.scalar_one_or_none()
+    trusted = await sender_cache.lookup_trusted(db, current_user.id, sender)
     
     return {
         "sender": sender,
         "is_trusted": trusted is not None,
-        "name": trusted.name if trusted else None
+        "name": trusted["name"] if trusted else None
     }
@@ -2,17 +2,28 @@
 User Management API
 User statistics, settings and profile
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, computed_field
 from app.db import get_db
-from app.models import User, Scan, TrustedSender, UserSettings, RiskLevel, PlatformType, GuardianLink
+from app.models import (
+    User, Scan, TrustedSender, BlockedSender, UserSettings, RiskLevel, PlatformType, GuardianLink,
+    SUPPORTED_LANGUAGES, ALERT_THRESHOLDS
+)
 from app.routers.auth import get_current_user
+from app.core.guardian_cache import invalidate_guardian_contact
+from app.services.account_purge import purge_user_in_background
+from app.core import stats_cache
 
 router = APIRouter()
 
+QUICK_TOGGLE_LANGUAGES = frozenset({"en", "hi"})
+
 
 # ============== Schemas ==============
 
@@ -61,11 +72,56 @@ class UserProfileResponse(BaseModel):
     """User profile response"""
     id: int
     email: str
-    name: str
+    first_name: str
+    middle_name: str | None
+    last_name: str
     phone: str | None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+    
+    @computed_field
+    @property
+    def name(self) -> str:
+        """Display name assembled from the stored name parts"""
+        return " ".join(part for part in (self.first_name, self.middle_name, self.last_name) if part)
+
+
+async def _fetch_one(db: AsyncSession, stmt):
+    return (await db.execute(stmt)).one()
+
+
+async def _fetch_one_own_session(bind: AsyncEngine, stmt):
+    """Run a read-only query on a separate session/connection from the request's"""
+    async with AsyncSession(bind) as session:
+        return await _fetch_one(session, stmt)
+
+
+def _protection_score(guardians_count: int, total_scans: int, high_risk: int, blocked_count: int) -> int:
+    """
+    Protection score (0-100).
+    Based on: having guardians, regular scans, detected threats, blocking.
+    """
+    score = 30 if guardians_count > 0 else 0
+    score += 20 if total_scans > 10 else 10 if total_scans > 0 else 0
+    score += 30 if high_risk > 0 else 0  # Successfully detected threats
+    score += 20 if blocked_count > 0 else 0  # User is actively blocking
+    return min(score, 100)
+
+
+async def _upsert_settings(db: AsyncSession, user_id: int, values: dict) -> UserSettings:
+    """Create or update the user's settings row in one round-trip (unique user_id makes it atomic)"""
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    return await db.scalar(
+        dialect_insert(UserSettings)
+        .values(user_id=user_id, **values)
+        # onupdate doesn't fire for ON CONFLICT, so updated_at is set explicitly
+        .on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={**values, "updated_at": datetime.utcnow()}
+        )
+        .returning(UserSettings),
+        execution_options={"populate_existing": True}
+    )
 
 
 # ============== Endpoints ==============
@@ -76,81 +132,51 @@ async def get_user_stats(
     current_user: User = Depends(get_current_user)
 ):
     """Get comprehensive user statistics"""
-    
-    # Total scans
-    total_result = await db.execute(
-        select(func.count(Scan.id)).where(Scan.user_id == current_user.id)
+    cached = await stats_cache.get_cached_stats(current_user.id)
+    if cached is not None:
+        # Already serialized UserStats JSON: send it as-is instead of parsing and re-encoding
+        return Response(content=cached, media_type="application/json")
+    
+    # Scan totals, per-risk counts and last scan in one pass over the user's scans
+    scan_stats_stmt = select(
+        func.count(),
+        func.count().filter(Scan.risk_level == RiskLevel.HIGH),
+        func.count().filter(Scan.risk_level == RiskLevel.MEDIUM),
+        func.max(Scan.created_at)
+    ).where(Scan.user_id == current_user.id)
+    
+    # Active guardians, trusted senders and blocked senders in a second query
+    link_counts_stmt = select(
+        select(func.count(GuardianLink.id)).where(
+            GuardianLink.user_id == current_user.id,
+            GuardianLink.status == 'active'
+        ).scalar_subquery(),
+        select(func.count(TrustedSender.id)).where(
+            TrustedSender.user_id == current_user.id
+        ).scalar_subquery(),
+        select(func.count(BlockedSender.id)).where(
+            BlockedSender.user_id == current_user.id
+        ).scalar_subquery()
     )
-    total_scans = total_result.scalar() or 0
     
-    # High risk count
-    high_result = await db.execute(
-        select(func.count(Scan.id)).where(
-            Scan.user_id == current_user.id,
-            Scan.risk_level == RiskLevel.HIGH
+    if db.get_bind().dialect.name == "postgresql":
+        # Overlap the two round-trips; an AsyncSession can't run queries concurrently,
+        # so the second one gets its own pooled connection
+        scan_stats, link_counts = await asyncio.gather(
+            _fetch_one(db, scan_stats_stmt),
+            _fetch_one_own_session(db.bind, link_counts_stmt)
         )
-    )
-    high_risk = high_result.scalar() or 0
+    else:
+        scan_stats = await _fetch_one(db, scan_stats_stmt)
+        link_counts = await _fetch_one(db, link_counts_stmt)
     
-    # Medium risk count
-    medium_result = await db.execute(
-        select(func.count(Scan.id)).where(
-            Scan.user_id == current_user.id,
-            Scan.risk_level == RiskLevel.MEDIUM
-        )
-    )
-    medium_risk = medium_result.scalar() or 0
+    total_scans, high_risk, medium_risk, last_scan_at = scan_stats
+    guardians_count, trusted_count, blocked_count = link_counts
     
     # Low risk (safe) count
     low_risk = total_scans - high_risk - medium_risk
     
-    # Guardians count (Active links)
-    guardians_result = await db.execute(
-        select(func.count(GuardianLink.id)).where(
-            GuardianLink.user_id == current_user.id,
-            GuardianLink.status == 'active'
-        )
-    )
-    guardians_count = guardians_result.scalar() or 0
-    
-    # Trusted senders count
-    trusted_result = await db.execute(
-        select(func.count(TrustedSender.id)).where(TrustedSender.user_id == current_user.id)
-    )
-    trusted_count = trusted_result.scalar() or 0
-    
-    # Blocked senders count (unique)
-    blocked_result = await db.execute(
-        select(func.count(func.distinct(Scan.sender))).where(
-            Scan.user_id == current_user.id,
-            Scan.is_blocked == True
-        )
-    )
-    blocked_count = blocked_result.scalar() or 0
-    
-    # Last scan
-    last_scan_result = await db.execute(
-        select(Scan.created_at).where(
-            Scan.user_id == current_user.id
-        ).order_by(Scan.created_at.desc()).limit(1)
-    )
-    last_scan_at = last_scan_result.scalar()
-    
-    # Calculate protection score (0-100)
-    # Based on: having guardians, regular scans, blocking threats
-    score = 0
-    if guardians_count > 0:
-        score += 30
-    if total_scans > 10:
-        score += 20
-    elif total_scans > 0:
-        score += 10
-    if high_risk > 0:  # Successfully detected threats
-        score += 30
-    if blocked_count > 0:  # User is actively blocking
-        score += 20
-    
-    return UserStats(
+    stats = UserStats(
         total_scans=total_scans,
         high_risk_blocked=high_risk,
         medium_risk_detected=medium_risk,
@@ -160,8 +186,10 @@ async def get_user_stats(
         blocked_senders_count=blocked_count,
         protected_since=current_user.created_at,
         last_scan_at=last_scan_at,
-        protection_score=min(score, 100)
+        protection_score=_protection_score(guardians_count, total_scans, high_risk, blocked_count)
     )
+    await stats_cache.cache_stats(current_user.id, stats.model_dump_json())
+    return stats
 
 
 @router.get("/settings", response_model=UserSettingsResponse)
@@ -181,7 +209,6 @@ async def get_user_settings(
         settings = UserSettings(user_id=current_user.id)
         db.add(settings)
         await db.commit()
-        await db.refresh(settings)
     
     return settings
 
@@ -194,35 +221,15 @@ async def update_user_settings(
 ):
     """Update user settings"""
     
-    result = await db.execute(
-        select(UserSettings).where(UserSettings.user_id == current_user.id)
-    )
-    settings = result.scalar_one_or_none()
-    
-    # Create if not exists
-    if not settings:
-        settings = UserSettings(user_id=current_user.id)
-        db.add(settings)
+    # Validate fields if provided
+    if update.language is not None and update.language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(status_code=400, detail="Unsupported language")
     
-    # Update fields if provided
-    if update.language is not None:
-        if update.language not in ["en", "hi", "ta", "te", "mr", "bn"]:
-            raise HTTPException(status_code=400, detail="Unsupported language")
-        settings.language = update.language
-    
-    if update.auto_block_high_risk is not None:
-        settings.auto_block_high_risk = update.auto_block_high_risk
-    
-    if update.alert_guardians_threshold is not None:
-        if update.alert_guardians_threshold not in ["HIGH", "MEDIUM", "ALL"]:
-            raise HTTPException(status_code=400, detail="Invalid threshold")
-        settings.alert_guardians_threshold = update.alert_guardians_threshold
-    
-    if update.receive_tips is not None:
-        settings.receive_tips = update.receive_tips
+    if update.alert_guardians_threshold is not None and update.alert_guardians_threshold not in ALERT_THRESHOLDS:
+        raise HTTPException(status_code=400, detail="Invalid threshold")
     
+    settings = await _upsert_settings(db, current_user.id, update.model_dump(exclude_none=True))
     await db.commit()
-    await db.refresh(settings)
     
     return settings
 
@@ -235,20 +242,10 @@ async def set_language(
 ):
     """Quick language toggle endpoint"""
     
-    if lang not in ["en", "hi"]:
+    if lang not in QUICK_TOGGLE_LANGUAGES:
         raise HTTPException(status_code=400, detail="Language must be 'en' or 'hi'")
     
-    result = await db.execute(
-        select(UserSettings).where(UserSettings.user_id == current_user.id)
-    )
-    settings = result.scalar_one_or_none()
-    
-    if not settings:
-        settings = UserSettings(user_id=current_user.id, language=lang)
-        db.add(settings)
-    else:
-        settings.language = lang
-    
+    await _upsert_settings(db, current_user.id, {"language": lang})
     await db.commit()
     
     return {"message": f"Language set to {lang}", "language": lang}
@@ -261,12 +258,7 @@ async def get_profile(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user profile"""
-    return UserProfileResponse(
-        id=current_user.id,
-        email=current_user.email,
-        name=current_user.name,
-        phone=current_user.phone
-    )
+    return UserProfileResponse.model_validate(current_user)
 
 
 @router.put("/profile", response_model=UserProfileResponse)
@@ -277,30 +269,20 @@ async def update_profile(
 ):
     """Update user profile (name, phone)"""
     
-    # Build new name from parts
-    name_parts = []
+    # Name parts are stored separately; the display name is computed on the response
     if update.first_name is not None:
-        name_parts.append(update.first_name.strip())
-    if update.middle_name is not None and update.middle_name.strip():
-        name_parts.append(update.middle_name.strip())
+        current_user.first_name = update.first_name.strip()
+    if update.middle_name is not None:
+        current_user.middle_name = update.middle_name.strip() or None
     if update.last_name is not None:
-        name_parts.append(update.last_name.strip())
-    
-    if name_parts:
-        current_user.name = " ".join(name_parts)
+        current_user.last_name = update.last_name.strip()
     
     if update.phone is not None:
         current_user.phone = update.phone.strip() if update.phone else None
     
     await db.commit()
-    await db.refresh(current_user)
     
-    return UserProfileResponse(
-        id=current_user.id,
-        email=current_user.email,
-        name=current_user.name,
-        phone=current_user.phone
-    )
+    return UserProfileResponse.model_validate(current_user)
 
 
 # ============== FCM Token ==============
@@ -320,8 +302,11 @@ async def register_fcm_token(
     Register Firebase Cloud Messaging token for push notifications.
     Called by Flutter app on startup and token refresh.
     """
-    current_user.fcm_token = request.fcm_token
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(fcm_token=request.fcm_token)
+    )
     await db.commit()
+    await invalidate_guardian_contact(db, current_user.id)
     
     return {"message": "FCM token registered", "success": True}
 
@@ -332,8 +317,11 @@ async def remove_fcm_token(
     current_user: User = Depends(get_current_user)
 ):
     """Remove FCM token (called on logout)"""
-    current_user.fcm_token = None
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(fcm_token=None)
+    )
     await db.commit()
+    await invalidate_guardian_contact(db, current_user.id)
     
     return {"message": "FCM token removed", "success": True}
 
@@ -361,10 +349,10 @@ async def change_password(
     Change user password.
     Requires current password for verification.
     """
-    from app.routers.auth import verify_password, get_password_hash
+    from app.routers.auth import verify_password_async, get_password_hash_async
     
     # Verify current password
-    if not verify_password(request.current_password, current_user.password_hash):
+    if not await verify_password_async(request.current_password, current_user.password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Validate new password
@@ -374,8 +362,11 @@ async def change_password(
     if request.current_password == request.new_password:
         raise HTTPException(status_code=400, detail="New password must be different")
     
-    # Update password
-    current_user.password_hash = get_password_hash(request.new_password)
+    # Update password (single-column UPDATE; no unit-of-work flush of the loaded user)
+    password_hash = await get_password_hash_async(request.new_password)
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(password_hash=password_hash)
+    )
     await db.commit()
     
     return {"message": "Password changed successfully", "success": True}
@@ -390,16 +381,12 @@ async def export_user_data(
     Export all user data as formatted TXT.
     GDPR-compliant data export.
     """
-    from fastapi.responses import PlainTextResponse
-    
-    # Get user scans
-    scans_result = await db.execute(
-        select(Scan)
-        .where(Scan.user_id == current_user.id)
-        .order_by(Scan.created_at.desc())
-        .limit(500)
+    from fastapi.responses import StreamingResponse
+    
+    # Scan count for the header; the scans themselves are streamed below
+    scan_count = await db.scalar(
+        select(func.count()).where(Scan.user_id == current_user.id)
     )
-    scans = scans_result.scalars().all()
     
     # Get trusted senders
     trusted_result = await db.execute(
@@ -413,67 +400,92 @@ async def export_user_data(
     )
     settings = settings_result.scalar_one_or_none()
     
-    # Build TXT content
-    lines = [
-        "=" * 50,
-        "  DETOOZ - YOUR DATA EXPORT",
-        f"  Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        "=" * 50,
-        "",
-        "PROFILE",
-        "-" * 30,
-        f"Name: {current_user.first_name} {current_user.middle_name or ''} {current_user.last_name}".strip(),
-        f"Email: {current_user.email}",
-        f"Phone: {current_user.phone or 'Not set'}",
-        f"Joined: {current_user.created_at.strftime('%Y-%m-%d')}",
-        "",
-        f"SCAN HISTORY ({len(scans)} scans)",
-        "-" * 30,
-    ]
-    
-    for i, scan in enumerate(scans, 1):
-        lines.append(f"{i}. [{scan.risk_level.value}] {scan.created_at.strftime('%Y-%m-%d %H:%M')}")
-        lines.append(f"   Sender: {scan.sender or 'Unknown'}")
-        lines.append(f"   Message: {(scan.message_preview or scan.message or '')[:100]}...")
-        if scan.scam_type:
-            lines.append(f"   Scam Type: {scan.scam_type}")
-        lines.append("")
-    
-    lines.extend([
-        f"TRUSTED SENDERS ({len(trusted)})",
-        "-" * 30,
-    ])
-    
-    for ts in trusted:
-        lines.append(f"- {ts.sender} ({ts.name or 'No name'})")
-    
-    lines.extend([
-        "",
-        "SETTINGS",
-        "-" * 30,
-    ])
-    
-    if settings:
-        lines.append(f"Language: {settings.language}")
-        lines.append(f"Auto-block high risk: {settings.auto_block_high_risk}")
-        lines.append(f"Guardian alert threshold: {settings.alert_guardians_threshold}")
-        lines.append(f"Receive tips: {settings.receive_tips}")
-    else:
-        lines.append("Default settings")
-    
-    lines.extend([
-        "",
-        "=" * 50,
-        "  End of Export",
-        "=" * 50,
-    ])
-    
-    return PlainTextResponse("\n".join(lines))
+    def text_block(lines: list[str]) -> bytes:
+        return "".join(f"{line}\n" for line in lines).encode()
+    
+    async def generate():
+        yield text_block([
+            "=" * 50,
+            "  DETOOZ - YOUR DATA EXPORT",
+            f"  Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "=" * 50,
+            "",
+            "PROFILE",
+            "-" * 30,
+            f"Name: {current_user.first_name} {current_user.middle_name or ''} {current_user.last_name}".strip(),
+            f"Email: {current_user.email}",
+            f"Phone: {current_user.phone or 'Not set'}",
+            f"Joined: {current_user.created_at.strftime('%Y-%m-%d')}",
+            "",
+            f"SCAN HISTORY ({scan_count} scans)",
+            "-" * 30,
+        ])
+        
+        # Stream scans straight from the cursor so memory stays flat for long histories.
+        # Only the printed columns; the full message body is only fetched when there's no preview
+        scans = await db.stream(
+            select(
+                Scan.risk_level,
+                Scan.created_at,
+                Scan.sender,
+                func.coalesce(func.nullif(Scan.message_preview, ""), Scan.message).label("text"),
+                Scan.scam_type
+            )
+            .where(Scan.user_id == current_user.id)
+            .order_by(Scan.created_at.desc())
+            .execution_options(yield_per=500)
+        )
+        i = 0
+        async for scan in scans:
+            i += 1
+            lines = [
+                f"{i}. [{scan.risk_level.value}] {scan.created_at.strftime('%Y-%m-%d %H:%M')}",
+                f"   Sender: {scan.sender or 'Unknown'}",
+                f"   Message: {(scan.text or '')[:100]}...",
+            ]
+            if scan.scam_type:
+                lines.append(f"   Scam Type: {scan.scam_type}")
+            lines.append("")
+            yield text_block(lines)
+        
+        lines = [
+            f"TRUSTED SENDERS ({len(trusted)})",
+            "-" * 30,
+        ]
+        
+        for ts in trusted:
+            lines.append(f"- {ts.sender} ({ts.name or 'No name'})")
+        
+        lines.extend([
+            "",
+            "SETTINGS",
+            "-" * 30,
+        ])
+        
+        if settings:
+            lines.append(f"Language: {settings.language}")
+            lines.append(f"Auto-block high risk: {settings.auto_block_high_risk}")
+            lines.append(f"Guardian alert threshold: {settings.alert_guardians_threshold}")
+            lines.append(f"Receive tips: {settings.receive_tips}")
+        else:
+            lines.append("Default settings")
+        
+        lines.extend([
+            "",
+            "=" * 50,
+            "  End of Export",
+            "=" * 50,
+        ])
+        # The old single-string export had no trailing newline
+        yield text_block(lines)[:-1]
+    
+    return StreamingResponse(generate(), media_type="text/plain; charset=utf-8")
 
 
 @router.delete("/delete-account")
 async def delete_account(
     request: DeleteAccountRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -481,15 +493,21 @@ async def delete_account(
     Permanently delete user account and all associated data.
     Requires password confirmation.
     """
-    from app.routers.auth import verify_password
+    from app.routers.auth import verify_password_async
     
     # Verify password
-    if not verify_password(request.password, current_user.password_hash):
+    if not await verify_password_async(request.password, current_user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect password")
     
-    # Delete user (cascades to related data)
-    await db.delete(current_user)
+    # Soft-delete now (the account stops authenticating immediately), then purge
+    # the user and their data in chunks after the response. db.delete(user) would
+    # load every related scan into the session just to cascade the delete.
+    await db.execute(
+        update(User).where(User.id == current_user.id)
+        .values(is_active=False, deleted_at=datetime.utcnow())
+    )
     await db.commit()
+    background_tasks.add_task(purge_user_in_background, db.bind, current_user.id)
     
     return {"message": "Account deleted successfully", "success": True}
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
 from datetime import datetime
 from app.models import PlatformType, RiskLevel
 
@@ -14,7 +14,8 @@ class UserCreate(BaseModel):
     phone: str | None = None
     country_code: str | None = "+91"
 
-    # @validator('password')
+    # @field_validator('password')
+    # @classmethod
     # def validate_password(cls, v):
     #     if len(v) < 8:
     #         raise ValueError('Password must be at least 8 characters')
@@ -43,8 +44,7 @@ class UserResponse(BaseModel):
     is_active: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -87,8 +87,7 @@ class GuardianResponse(BaseModel):
     last_alert_sent: datetime | None
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============== Scan Schemas ==============
@@ -111,15 +110,15 @@ class ScanResponse(BaseModel):
     guardian_alerted: bool
     created_at: datetime
     
-    @validator("created_at")
+    @field_validator("created_at")
+    @classmethod
     def set_utc_timezone(cls, v):
         if v.tzinfo is None:
             from datetime import timezone
             return v.replace(tzinfo=timezone.utc)
         return v
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ScanDetail(ScanResponse):
@@ -0,0 +1,90 @@
+"""
+Account Purge Service
+Hard-deletes a user and every row that references them, in small chunks,
+so no single transaction has to hold locks over a heavy user's history.
+"""
+from sqlalchemy import select, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+import logging
+
+from app.models import (
+    User, Scan, TrustedSender, BlockedSender, Feedback, UserSettings, GuardianLink,
+    GuardianAlert, ConsentLog, UserBookmark
+)
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHUNK_SIZE = 1000
+PURGE_SWEEP_INTERVAL = 15 * 60  # seconds between sweeps for accounts a purge missed
+
+
+async def _delete_in_chunks(db: AsyncSession, model, *criteria, chunk_size: int):
+    """Delete matching rows chunk_size at a time, committing after each chunk"""
+    while True:
+        ids = (await db.execute(
+            select(model.id).where(*criteria).limit(chunk_size)
+        )).scalars().all()
+        if not ids:
+            return
+        await db.execute(delete(model).where(model.id.in_(ids)))
+        await db.commit()
+
+
+async def purge_user(db: AsyncSession, user_id: int, chunk_size: int = PURGE_CHUNK_SIZE):
+    """
+    Delete a user and their data.
+    Children go first: SQLite doesn't enforce ON DELETE CASCADE unless foreign keys are enabled.
+    """
+    # Guardian alerts reference scans, and feedback references scans
+    await _delete_in_chunks(
+        db, GuardianAlert,
+        or_(GuardianAlert.user_id == user_id, GuardianAlert.guardian_id == user_id),
+        chunk_size=chunk_size
+    )
+    await _delete_in_chunks(
+        db, GuardianLink,
+        or_(GuardianLink.user_id == user_id, GuardianLink.guardian_id == user_id),
+        chunk_size=chunk_size
+    )
+    await _delete_in_chunks(db, Feedback, Feedback.user_id == user_id, chunk_size=chunk_size)
+    await _delete_in_chunks(db, Scan, Scan.user_id == user_id, chunk_size=chunk_size)
+
+    for model in (TrustedSender, BlockedSender, UserSettings, ConsentLog, UserBookmark):
+        await _delete_in_chunks(db, model, model.user_id == user_id, chunk_size=chunk_size)
+
+    await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
+
+
+async def purge_user_in_background(bind: AsyncEngine, user_id: int):
+    """
+    Background task: purge a soft-deleted account with its own session on the request's engine.
+    If it fails (or the process restarts first), purge_deleted_accounts picks the user up.
+    """
+    async with AsyncSession(bind, expire_on_commit=False) as db:
+        try:
+            await purge_user(db, user_id)
+            logger.info(f"Purged account {user_id}")
+        except Exception:
+            await db.rollback()
+            logger.exception(f"Account purge failed for user {user_id}; the next sweep will retry")
+
+
+async def purge_deleted_accounts(db: AsyncSession) -> int:
+    """
+    Purge every account marked deleted (deleted_at set) that is still in the database.
+    Returns how many were purged; a failing account is logged and left for the next sweep.
+    """
+    user_ids = (await db.execute(
+        select(User.id).where(User.deleted_at.is_not(None))
+    )).scalars().all()
+
+    purged = 0
+    for user_id in user_ids:
+        try:
+            await purge_user(db, user_id)
+            purged += 1
+        except Exception:
+            await db.rollback()
+            logger.exception(f"Account purge sweep failed for user {user_id}")
+    return purged
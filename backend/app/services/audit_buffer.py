@@ -0,0 +1,120 @@
+"""
+Audit Log Buffer
+Collects consent audit rows in memory and writes them in batches,
+so consent endpoints don't pay a commit per event.
+"""
+import asyncio
+import logging
+from sqlalchemy import insert
+from app.models import ConsentLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    """Queue of ConsentLog rows flushed by a background task"""
+
+    def __init__(
+        self,
+        max_batch: int = 500,
+        flush_interval: float = 0.5,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+        max_attempts: int = 5
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay  # first backoff after a failed write, doubled per failure
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts  # batch writes before falling back to row by row
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._pending: list[dict] = []  # taken off the queue, not yet written
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the flush loop (called from the app lifespan)"""
+        if not self.running:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        batch, self._pending = self._pending, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch and not await self._write(batch):
+            await self._write_rows(batch)
+
+    def log(self, **row):
+        """Queue one ConsentLog row (column name -> value)"""
+        self.queue.put_nowait(row)
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        retry_delay = self.retry_delay
+        attempts = 0
+        while True:
+            # Block until there's work (unless a failed batch is waiting to be retried),
+            # then collect for up to flush_interval
+            if not self._pending:
+                self._pending.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            if await self._write(self._pending):
+                self._pending = []
+                retry_delay, attempts = self.retry_delay, 0
+                continue
+
+            attempts += 1
+            if attempts >= self.max_attempts:
+                # Stop retrying the batch as a whole so one bad row can't block the buffer
+                await self._write_rows(self._pending)
+                self._pending = []
+                retry_delay, attempts = self.retry_delay, 0
+                continue
+
+            # Keep the batch in _pending and retry it with exponential backoff
+            logger.warning(f"Audit buffer: retrying {len(self._pending)} rows in {retry_delay:g}s")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, self.max_retry_delay)
+
+    async def _write(self, batch: list[dict]) -> bool:
+        """Insert batch in one transaction; False if it failed"""
+        from app.db.database import async_session
+
+        try:
+            async with async_session() as db:
+                await db.execute(insert(ConsentLog), batch)
+                await db.commit()
+            return True
+        except Exception:
+            logger.exception(f"Audit buffer flush failed ({len(batch)} rows)")
+            return False
+
+    async def _write_rows(self, batch: list[dict]):
+        """Write rows one at a time, spilling any that still fail to the log so they aren't lost silently"""
+        for row in batch:
+            if not await self._write([row]):
+                logger.error(f"Audit buffer: unwritable ConsentLog row {row}")
+
+
+# Global instance
+audit_buffer = AuditBuffer()
@@ -4,15 +4,29 @@ Handles automatic blacklist population from AI detections
 and export for LLM training
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_
 from datetime import datetime
 import hashlib
 import json
+import orjson
 import re
 from typing import Optional, Dict, List
 from app.models import Blacklist
 from app.core.redis_client import redis_client
 
+_NON_PHONE_CHARS_RE = re.compile(r'[^\d+]')
+# Every ASCII byte except digits and '+', for the bytes.translate fast path
+_NON_PHONE_ASCII = bytes(c for c in range(128) if chr(c) not in "0123456789+")
+
+
+def strip_non_phone_chars(value: str) -> str:
+    """Keep only digits and '+' (ASCII input skips the regex engine)"""
+    if value.isascii():
+        return value.encode("ascii").translate(None, _NON_PHONE_ASCII).decode("ascii")
+    # \d also matches non-ASCII digits, so other input keeps the regex
+    return _NON_PHONE_CHARS_RE.sub('', value)
+
+
 class BlacklistManager:
     """Manages automatic blacklist updates and training data export"""
     
@@ -26,7 +40,7 @@ class BlacklistManager:
         """Normalize value for consistent storage"""
         if value_type == "phone":
             # Remove all non-digits, keep + at start
-            digits = re.sub(r'[^\d+]', '', value)
+            digits = strip_non_phone_chars(value)
             if not digits.startswith('+'):
                 if digits.startswith('91') and len(digits) == 12:
                     digits = '+' + digits
@@ -37,8 +51,12 @@ class BlacklistManager:
         elif value_type == "url":
             # Remove protocol, lowercase, remove trailing slash
             value = value.lower().strip()
-            value = re.sub(r'^https?://', '', value)
-            value = re.sub(r'/$', '', value)
+            if value.startswith('https://'):
+                value = value[8:]
+            elif value.startswith('http://'):
+                value = value[7:]
+            if value.endswith('/'):
+                value = value[:-1]
             return value
         
         elif value_type == "domain":
@@ -53,8 +71,17 @@ class BlacklistManager:
 
     @staticmethod
     def compute_hash(value: str) -> str:
-        """SHA256 hash for fast lookup"""
-        return hashlib.sha256(value.encode()).hexdigest()
+        """128-bit BLAKE2b hash for fast lookup (a lookup key, not a security boundary)"""
+        return hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def cache_key(content_type: str, value_hash: str) -> str:
+        """Redis key for a cached check_blacklist result"""
+        return f"rep:{content_type}:{value_hash}"
+
+    async def invalidate(self, content_type: str, value_hash: str):
+        """Drop the cached lookup after the entry is created or its counts change"""
+        await redis_client.delete(self.cache_key(content_type, value_hash))
 
     async def auto_blacklist(self, value: str, content_type: str, source: str, db: AsyncSession, **kwargs) -> bool:
         """
@@ -80,6 +107,7 @@ class BlacklistManager:
             existing.reports_count += 1
             existing.last_reported_at = datetime.utcnow()
             await db.commit()
+            await self.invalidate(content_type, value_hash)
             return False
             
         # Add new entry
@@ -103,8 +131,7 @@ class BlacklistManager:
         await db.commit()
         
         # Invalidate Cache (Delete key so next fetch gets new data)
-        # Redis Key: bl:{value_hash}
-        redis_client.delete(f"bl:{value_hash}")
+        await self.invalidate(content_type, value_hash)
         
         return True
 
@@ -168,22 +195,28 @@ class BlacklistManager:
         normalized = self.normalize_value(value, content_type)
         value_hash = self.compute_hash(normalized)
         
-        # 1. Check Redis Cache
-        cached_json = redis_client.get(f"bl:{value_hash}")
+        # 1. Check Redis Cache (negative results are cached too)
+        cache_key = self.cache_key(content_type, value_hash)
+        cached_json = await redis_client.get(cache_key)
         if cached_json:
             try:
-                return json.loads(cached_json)
-            except json.JSONDecodeError:
+                return orjson.loads(cached_json)
+            except orjson.JSONDecodeError:
                 pass # Fall through to DB
             
         # 2. Check DB
         result = await db.execute(
-            select(Blacklist).where(
+            select(
+                Blacklist.reports_count,
+                Blacklist.scam_type,
+                Blacklist.confidence_score,
+                Blacklist.is_verified
+            ).where(
                 Blacklist.value_hash == value_hash,
                 Blacklist.type == content_type
             )
         )
-        entry = result.scalar_one_or_none()
+        entry = result.first()
         
         if entry:
             res = {
@@ -197,10 +230,65 @@ class BlacklistManager:
         else:
             res = {"is_blacklisted": False, "reports_count": 0, "risk_boost": 0}
             
-        # 3. Update Redis (TTL: 1 Hour)
-        redis_client.setex(f"bl:{value_hash}", 3600, json.dumps(res))
+        # 3. Update Redis (TTL: 10 minutes; writes through this service and /report invalidate sooner)
+        await redis_client.setex(cache_key, 600, orjson.dumps(res))
         
         return res
 
+    # Columns of the csv training export, in order
+    TRAINING_CSV_FIELDS = [
+        "type", "value", "scam_type", "confidence", "reports_count",
+        "is_verified", "language", "message", "reasoning"
+    ]
+    
+    TRAINING_SYSTEM_PROMPT = "You are a scam detection assistant for Indian SMS and WhatsApp messages."
+    
+    @staticmethod
+    def training_data_query(min_confidence: float, verified_only: bool, limit: int):
+        """Select blacklist entries eligible for training export (confident AI detections or verified)"""
+        query = select(Blacklist)
+        if verified_only:
+            query = query.where(Blacklist.is_verified == True)
+        else:
+            query = query.where(or_(
+                Blacklist.confidence_score >= min_confidence,
+                Blacklist.is_verified == True
+            ))
+        return query.order_by(Blacklist.id).limit(limit)
+    
+    def to_training_record(self, entry: Blacklist, format: str) -> Dict:
+        """
+        Convert a blacklist entry to one training record.
+        Entries stored without consent have no message text and export as REDACTED.
+        """
+        message = entry.full_message or f"[REDACTED] {entry.type}: {entry.value}"
+        reasoning = entry.ai_reasoning or f"Reported as scam {entry.reports_count} time(s)"
+        
+        if format == "csv":
+            return {
+                "type": entry.type,
+                "value": entry.value,
+                "scam_type": entry.scam_type,
+                "confidence": entry.confidence_score,
+                "reports_count": entry.reports_count,
+                "is_verified": entry.is_verified,
+                "language": entry.language,
+                "message": message,
+                "reasoning": reasoning
+            }
+        
+        # OpenAI fine-tuning chat format
+        return {
+            "messages": [
+                {"role": "system", "content": self.TRAINING_SYSTEM_PROMPT},
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": json.dumps({
+                    "risk_level": "HIGH",
+                    "reason": reasoning,
+                    "scam_type": entry.scam_type
+                })}
+            ]
+        }
+
 # Global instance
 blacklist_manager = BlacklistManager()
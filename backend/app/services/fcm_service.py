@@ -4,13 +4,17 @@ Firebase Cloud Messaging (FCM) Push Notification Service - V1 API
 Sends push notifications to guardians when scams are detected.
 Uses Firebase Admin SDK with service account credentials.
 """
+import asyncio
 import json
 import os
 from typing import Optional
 import httpx
+import logging
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
 
+logger = logging.getLogger(__name__)
+
 
 class FCMService:
     """Service for sending Firebase Cloud Messaging push notifications using V1 API"""
@@ -18,8 +22,17 @@ class FCMService:
     def __init__(self):
         self.project_id = None
         self.credentials = None
+        # One pooled client for every push, so alerts reuse the TCP/TLS connection to FCM
+        self.client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=50)
+        )
         self._load_credentials()
     
+    async def close(self):
+        """Close the pooled HTTP client (called from the app lifespan)"""
+        await self.client.aclose()
+    
     def _load_credentials(self):
         """Load Firebase service account credentials (Hybrid: Env Var or Local File)"""
         
@@ -33,10 +46,10 @@ class FCMService:
                     service_account_info,
                     scopes=['https://www.googleapis.com/auth/firebase.messaging']
                 )
-                print(f"✅ FCM Service initialized from ENV VAR with project: {self.project_id}")
+                logger.info("FCM Service initialized from ENV VAR with project: %s", self.project_id)
                 return
             except Exception as e:
-                print(f"❌ Failed to parse FIREBASE_CREDENTIALS_JSON: {e}")
+                logger.error("Failed to parse FIREBASE_CREDENTIALS_JSON: %s", e)
 
         # 2. Try Local File (College Project Mode)
         service_account_path = os.path.join(
@@ -54,23 +67,24 @@ class FCMService:
                     service_account_path,
                     scopes=['https://www.googleapis.com/auth/firebase.messaging']
                 )
-                print(f"✅ FCM Service initialized from LOCAL FILE with project: {self.project_id}")
+                logger.info("FCM Service initialized from LOCAL FILE with project: %s", self.project_id)
             except Exception as e:
-                print(f"❌ Failed to load Firebase credentials file: {e}")
+                logger.error("Failed to load Firebase credentials file: %s", e)
         else:
-            print("⚠️ FCM credentials not found (Env Var or File). Push notifications disabled.")
+            logger.warning("FCM credentials not found (Env Var or File). Push notifications disabled.")
     
-    def _get_access_token(self) -> Optional[str]:
+    async def _get_access_token(self) -> Optional[str]:
         """Get a valid access token, refreshing if necessary"""
         if not self.credentials:
             return None
         
         try:
             if not self.credentials.valid:
-                self.credentials.refresh(Request())
+                # google-auth refreshes over blocking `requests`; keep it off the event loop
+                await asyncio.to_thread(self.credentials.refresh, Request())
             return self.credentials.token
         except Exception as e:
-            print(f"❌ Failed to get FCM access token: {e}")
+            logger.error("Failed to get FCM access token: %s", e)
             return None
     
     async def send_guardian_alert(
@@ -87,14 +101,14 @@ class FCMService:
         Send push notification to guardian about a scam alert using FCM V1 API.
         """
         if not self.project_id or not self.credentials:
-            print("⚠️ FCM not configured. Push notification skipped.")
+            logger.debug("FCM not configured. Push notification skipped.")
             return False
         
         if not fcm_token:
-            print("⚠️ No FCM token provided")
+            logger.warning("No FCM token provided")
             return False
         
-        access_token = self._get_access_token()
+        access_token = await self._get_access_token()
         if not access_token:
             return False
         
@@ -115,7 +129,7 @@ class FCMService:
                     "user_name": protected_user_name,
                     "scam_type": scam_type,
                     "sender": sender,
-                    "message_preview": message_preview[:100] if len(message_preview) > 100 else message_preview,
+                    "message_preview": message_preview[:100],
                     "risk_level": risk_level,
                     "click_action": "FLUTTER_NOTIFICATION_CLICK"
                 },
@@ -138,23 +152,17 @@ class FCMService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    timeout=10.0
-                )
+            response = await self.client.post(url, json=payload, headers=headers)
+            
+            if response.status_code == 200:
+                logger.debug("FCM push sent to guardian for alert #%s", alert_id)
+                return True
+            else:
+                logger.warning("FCM push failed: %s - %s", response.status_code, response.text)
+                return False
                 
-                if response.status_code == 200:
-                    print(f"✅ FCM push sent to guardian for alert #{alert_id}")
-                    return True
-                else:
-                    print(f"❌ FCM push failed: {response.status_code} - {response.text}")
-                    return False
-                    
         except Exception as e:
-            print(f"❌ FCM push error: {e}")
+            logger.error("FCM push error: %s", e)
             return False
     
     async def send_notification(
@@ -168,7 +176,7 @@ class FCMService:
         if not self.project_id or not self.credentials or not fcm_token:
             return False
         
-        access_token = self._get_access_token()
+        access_token = await self._get_access_token()
         if not access_token:
             return False
         
@@ -194,16 +202,10 @@ class FCMService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    timeout=10.0
-                )
-                return response.status_code == 200
+            response = await self.client.post(url, json=payload, headers=headers)
+            return response.status_code == 200
         except Exception as e:
-            print(f"FCM error: {e}")
+            logger.error("FCM error: %s", e)
             return False
 
 
@@ -2,9 +2,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
+import asyncio
+import logging
 
-from app.models import User, Scan, GuardianLink, GuardianAlert, UserSettings
+from app.models import User, Scan, GuardianAlert, UserSettings
 from app.services.fcm_service import fcm_service
+from app.core.redis_client import redis_client
+from app.core.guardian_cache import get_active_guardians
+
+logger = logging.getLogger(__name__)
+
+# Guardians poll /pending every ~10s; a short TTL absorbs repeat polls
+PENDING_ALERTS_CACHE_TTL = 5
+
+
+def pending_alerts_cache_key(guardian_id: int) -> str:
+    return f"pending_alerts:{guardian_id}"
+
+
+async def invalidate_pending_alerts_cache(guardian_id: int):
+    """Drop a guardian's cached /pending response after their alerts change"""
+    await redis_client.delete(pending_alerts_cache_key(guardian_id))
 
 
 class GuardianAlertService:
@@ -37,67 +55,59 @@ class GuardianAlertService:
         if not should_alert:
             return 0
         
-        # Get all active guardian links for this user
-        links_result = await db.execute(
-            select(GuardianLink).where(
-                GuardianLink.user_id == user.id,
-                GuardianLink.status == "active"
+        # Active guardians for this user (cached; links change rarely)
+        guardians = await get_active_guardians(db, user.id)
+        
+        if not guardians:
+            return 0
+        
+        alerts = [
+            GuardianAlert(
+                guardian_id=guardian["id"],
+                user_id=user.id,
+                scan_id=scan.id,
+                status="pending"
             )
-        )
-        links = links_result.scalars().all()
+            for guardian in guardians
+        ]
+        db.add_all(alerts)
         
-        alerts_created = 0
+        # Mark scan as guardian_alerted
+        scan.guardian_alerted = True
+        await db.commit()
         
-        for link in links:
-            if link.guardian_id:
-                # Create alert for this guardian
-                alert = GuardianAlert(
-                    guardian_id=link.guardian_id,
-                    user_id=user.id,
-                    scan_id=scan.id,
-                    status="pending"
-                )
-                db.add(alert)
-                await db.flush()  # Get alert ID
-                alerts_created += 1
-                
-                # Send FCM push notification to guardian
-                await self._send_fcm_to_guardian(
-                    db=db,
-                    guardian_id=link.guardian_id,
-                    user=user,
-                    scan=scan,
-                    alert_id=alert.id
-                )
+        # Independent Redis round-trips; no need to wait on them one by one
+        await asyncio.gather(*(
+            invalidate_pending_alerts_cache(guardian["id"]) for guardian in guardians
+        ))
         
-        if alerts_created > 0:
-            # Mark scan as guardian_alerted
-            scan.guardian_alerted = True
-            await db.commit()
+        # Send FCM push notifications to all guardians concurrently
+        await asyncio.gather(*(
+            self._send_fcm_to_guardian(
+                guardian=guardian,
+                user=user,
+                scan=scan,
+                alert_id=alert.id
+            )
+            for guardian, alert in zip(guardians, alerts)
+        ))
         
-        return alerts_created
+        return len(alerts)
     
     async def _send_fcm_to_guardian(
         self,
-        db: AsyncSession,
-        guardian_id: int,
+        guardian: dict,
         user: User,
         scan: Scan,
         alert_id: int
     ):
         """Send FCM push notification to guardian's device"""
         try:
-            # Get guardian's FCM token
-            guardian_result = await db.execute(
-                select(User).where(User.id == guardian_id)
-            )
-            guardian = guardian_result.scalar_one_or_none()
-            
-            if guardian and guardian.fcm_token:
-                protected_user_name = f"{user.first_name} {user.last_name}"
+            if guardian["fcm_token"]:
+                protected_user_name = user.full_name
                 
                 success = await fcm_service.send_guardian_alert(
-                    fcm_token=guardian.fcm_token,
+                    fcm_token=guardian["fcm_token"],
                     protected_user_name=protected_user_name,
                     scam_type=scan.scam_type or "Suspicious Message",
                     sender=scan.sender or "Unknown",
@@ -107,14 +117,14 @@ class GuardianAlertService:
                 )
                 
                 if success:
-                    print(f"✅ FCM push sent to guardian {guardian.email}")
+                    logger.debug("FCM push sent to guardian %s", guardian["email"])
                 else:
-                    print(f"⚠️ FCM push failed for guardian {guardian.email}")
+                    logger.warning("FCM push failed for guardian %s", guardian["email"])
             else:
-                print(f"⚠️ Guardian {guardian_id} has no FCM token registered")
+                logger.debug("Guardian for alert #%s has no FCM token registered", alert_id)
                 
         except Exception as e:
-            print(f"ERROR: FCM push failed: {e}")
+            logger.error("FCM push failed: %s", e)
     
     def _should_alert(self, risk_level: str, threshold: str) -> bool:
         """
@@ -140,14 +150,22 @@ class GuardianAlertService:
 guardian_alert_service = GuardianAlertService()
 
 
-async def send_guardian_alerts(db: AsyncSession, user: User, scan: Scan, result: dict):
+async def send_guardian_alerts(user_id: int, scan_id: int):
     """
     Background task to create guardian alerts and send FCM notifications.
-    Called from SMS analysis endpoint when HIGH risk detected.
+    Called from the analysis endpoints when HIGH risk is detected; runs after
+    the response with its own session (the request's is closed by then).
     """
-    try:
-        alerts_created = await guardian_alert_service.create_alerts_for_scan(db, user, scan)
-        print(f"DEBUG: Created {alerts_created} guardian alerts for scan {scan.id}")
-    except Exception as e:
-        print(f"ERROR: Failed to create guardian alerts: {e}")
-
+    from app.db.database import async_session
+    
+    async with async_session() as db:
+        try:
+            user = await db.get(User, user_id)
+            scan = await db.get(Scan, scan_id)
+            if user is None or scan is None:
+                return
+            alerts_created = await guardian_alert_service.create_alerts_for_scan(db, user, scan)
+            logger.debug("Created %d guardian alerts for scan %s", alerts_created, scan_id)
+        except Exception:
+            await db.rollback()
+            logger.exception("Failed to create guardian alerts")
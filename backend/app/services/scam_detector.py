@@ -1,12 +1,17 @@
 import json
 import base64
 import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
 import torch
 import torch.nn.functional as F
 from transformers import MobileBertTokenizerFast, MobileBertForSequenceClassification
 from app.config import settings
 from app.services.sms_patterns import check_patterns
 
+logger = logging.getLogger(__name__)
+
 # Try to import groq, but make it optional
 try:
     from groq import Groq
@@ -22,10 +27,114 @@ except ImportError:
     OPENROUTER_AVAILABLE = False
 
 
-# Module-level cache for Groq API calls (avoids @lru_cache on instance method)
-# Key: (message, sender) -> dict result
-_groq_cache: dict[tuple[str, str], dict] = {}
-_GROQ_CACHE_MAX_SIZE = 1024
+# Module-level LRU of model-backed analyze() results (avoids @lru_cache on instance method)
+# Key: blake2b(sender, message) -> dict result
+_analysis_cache: OrderedDict[bytes, dict] = OrderedDict()
+_ANALYSIS_CACHE_MAX_SIZE = 5000
+
+# Reason on _analyze_with_ai's fallback when Groq returns unparseable JSON
+_AI_INCONCLUSIVE_REASON = "AI analysis inconclusive"
+
+
+def _analysis_cache_key(message: str, sender: str) -> bytes:
+    return hashlib.blake2b(f"{sender}\x00{message}".encode(), digest_size=16).digest()
+
+# Local MobileBERT inference runs in worker threads; cap how many run at once so
+# concurrent requests don't oversubscribe torch's own intra-op threads
+_LOCAL_MODEL_CONCURRENCY = 2
+# Concurrent requests are coalesced into one padded forward pass of up to this many
+# messages, waiting at most this long for a batch to fill
+_LOCAL_MODEL_MAX_BATCH = 8
+_LOCAL_MODEL_MAX_WAIT = 0.02
+
+
+class _MicroBatcher:
+    """
+    Coalesces concurrent submit() calls into batches for a blocking batch function.
+    Each worker task takes up to max_batch queued items (waiting at most max_wait
+    for more after the first), runs batch_fn on them in a thread and resolves
+    every caller's future with its own result.
+    """
+
+    def __init__(self, batch_fn, max_batch: int, max_wait: float, workers: int):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop = None
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_workers(self):
+        # Started lazily: the detector is built at import time, before any event loop runs
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, item):
+        self._ensure_workers()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await asyncio.to_thread(self.batch_fn, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                # A caller that went away (client disconnect) has a cancelled future
+                if not future.done():
+                    future.set_result(result)
+
+
+class _TokenBucket:
+    """Async token bucket: acquire() waits until a request is allowed under rate/sec"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                # The token that accrued while sleeping is this request's
+                self.tokens = 0
+                self.updated = loop.time()
+            else:
+                self.tokens -= 1
 
 
 class ScamDetector:
@@ -99,11 +208,20 @@ class ScamDetector:
                     base_url="https://openrouter.ai/api/v1",
                     api_key=settings.OPENROUTER_API_KEY,
                 )
-                print("DEBUG: OpenRouter Initialized successfully")
+                logger.debug("OpenRouter Initialized successfully")
             except Exception as e:
-                print(f"DEBUG: OpenRouter Init Failed: {e}")
+                logger.warning("OpenRouter Init Failed: %s", e)
 
         # Local Model Initialization
+        self._local_batcher = _MicroBatcher(
+            self._sync_local_inference_batch,
+            max_batch=_LOCAL_MODEL_MAX_BATCH,
+            max_wait=_LOCAL_MODEL_MAX_WAIT,
+            workers=_LOCAL_MODEL_CONCURRENCY
+        )
+        # Bound Groq calls so bursts (e.g. /analyze-batch) queue here instead of tripping its rate limits
+        self._ai_slots = asyncio.Semaphore(settings.GROQ_MAX_CONCURRENCY)
+        self._ai_rate = _TokenBucket(settings.GROQ_REQUESTS_PER_SECOND, capacity=settings.GROQ_MAX_CONCURRENCY)
         self.local_model = None
         self.local_tokenizer = None
         try:
@@ -130,7 +248,7 @@ class ScamDetector:
                         break
             
             if model_path:
-                print(f"DEBUG: Loading Local Model from {model_path}...")
+                logger.debug("Loading Local Model from %s...", model_path)
                 self.local_tokenizer = MobileBertTokenizerFast.from_pretrained(model_path)
                 self.local_model = MobileBertForSequenceClassification.from_pretrained(model_path)
                 self.local_model.eval()
@@ -138,13 +256,13 @@ class ScamDetector:
                 # Use GPU if available
                 self.device = "cuda" if torch.cuda.is_available() else "cpu"
                 self.local_model.to(self.device)
-                print(f"DEBUG: Local Model Loaded on {self.device}")
+                logger.debug("Local Model Loaded on %s", self.device)
             else:
-                 print(f"INFO: Local MobileBERT model not found. Running in Cloud-Optimized Mode.")
-                 print(f"INFO: Enhanced Pattern Matching active for offline protection.")
+                 logger.info("Local MobileBERT model not found. Running in Cloud-Optimized Mode.")
+                 logger.info("Enhanced Pattern Matching active for offline protection.")
 
         except Exception as e:
-            print(f"INFO: Local AI Init skipped ({str(e)}). Using Cloud + Patterns.")
+            logger.info("Local AI Init skipped (%s). Using Cloud + Patterns.", e)
 
     
     async def analyze(self, message: str, sender: str) -> dict:
@@ -156,6 +274,13 @@ class ScamDetector:
         2. AI analysis for uncertain messages (smarter but slower)
         """
         
+        # Repeat messages (bank OTPs, delivery pings) skip the models
+        cache_key = _analysis_cache_key(message, sender)
+        cached = _analysis_cache.get(cache_key)
+        if cached is not None:
+            _analysis_cache.move_to_end(cache_key)
+            return dict(cached)
+        
         # Step 1: Quick pattern check using comprehensive patterns
         local_result = check_patterns(message, sender)
         
@@ -175,8 +300,8 @@ class ScamDetector:
             local_ai_result = await self._analyze_with_local_model(message)
             # If Local AI is confident, use its result and save Groq tokens
             if local_ai_result["confidence"] > 0.90:
-                 print(f"DEBUG: Local AI confident ({local_ai_result['risk_level']}), skipping Groq.")
-                 return local_ai_result
+                 logger.debug("Local AI confident (%s), skipping Groq.", local_ai_result["risk_level"])
+                 return self._remember(cache_key, local_ai_result)
             
             # If undecided but leaning towards scam, carry over context or just fall through
 
@@ -184,26 +309,29 @@ class ScamDetector:
         # Step 2: Use AI for uncertain messages (MEDIUM or LOW from patterns)
         if self.client:
             try:
-                print(f"DEBUG: Calling Groq AI for: {message[:50]}...")
+                logger.debug("Calling Groq AI for: %.50s...", message)
                 ai_result = await self._analyze_with_ai(message, sender)
                 
                 # If AI says HIGH and patterns say MEDIUM, trust AI
                 if ai_result["risk_level"] == "HIGH":
-                    return ai_result
+                    return self._remember(cache_key, ai_result)
                 
                 # If patterns say MEDIUM but AI says LOW, return MEDIUM (safer)
                 if local_result["risk_level"] == "MEDIUM" and ai_result["risk_level"] == "LOW":
-                    return {
+                    return self._remember(cache_key, {
                         "risk_level": "MEDIUM",
                         "reason": local_result["reason"],
                         "scam_type": local_result["scam_type"],
                         "confidence": max(local_result["confidence"], 0.5)
-                    }
+                    })
                 
-                return ai_result
+                # The invalid-JSON fallback isn't a model verdict; a retry may get a real one
+                if ai_result["reason"] == _AI_INCONCLUSIVE_REASON:
+                    return ai_result
+                return self._remember(cache_key, ai_result)
                 
             except Exception as e:
-                print(f"AI analysis failed: {e}")
+                logger.warning("AI analysis failed: %s", e)
                 # Fall back to local result
                 return {
                     "risk_level": local_result["risk_level"],
@@ -220,12 +348,24 @@ class ScamDetector:
             "confidence": local_result["confidence"]
         }
 
+    @staticmethod
+    def _remember(cache_key: bytes, result: dict) -> dict:
+        """Cache a model-backed result (pattern-only and fallback results aren't worth caching)"""
+        _analysis_cache[cache_key] = dict(result)
+        if len(_analysis_cache) > _ANALYSIS_CACHE_MAX_SIZE:
+            _analysis_cache.popitem(last=False)
+        return result
+
     async def _analyze_with_local_model(self, message: str) -> dict:
-        """Run inference on the local MobileBERT model"""
+        """Run local MobileBERT inference off the event loop, batched with concurrent requests"""
+        return await self._local_batcher.submit(message)
+
+    def _sync_local_inference_batch(self, messages: list[str]) -> list[dict]:
+        """Tokenize + run the local MobileBERT model on a batch (blocking, CPU/GPU bound)"""
         try:
-            # Tokenize
+            # Tokenize (padded to the longest message in the batch)
             inputs = self.local_tokenizer(
-                message, 
+                messages, 
                 return_tensors="pt", 
                 truncation=True, 
                 padding=True,
@@ -237,47 +377,43 @@ class ScamDetector:
                 outputs = self.local_model(**inputs)
                 probs = F.softmax(outputs.logits, dim=1)
                 confidence, predicted_class = torch.max(probs, dim=1)
-                
-            # Map Label (0=ham, 1=otp, 2=scam) - Must match training!
-            label_idx = predicted_class.item()
-            conf_score = confidence.item()
             
-            if label_idx == 2: # SCAM
-                return {
-                    "risk_level": "HIGH",
-                    "reason": "Flagged by Local MobileBERT",
-                    "scam_type": "Suspected Scam",
-                    "confidence": conf_score
-                }
-            elif label_idx == 1: # OTP
-                return {
-                    "risk_level": "LOW", # OTPs are safe but sensitive
-                    "reason": "Transactional OTP",
-                    "scam_type": "OTP",
-                    "confidence": conf_score
-                }
-            else: # HAM
-                return {
-                    "risk_level": "LOW",
-                    "reason": "Safe conversation",
-                    "scam_type": None,
-                    "confidence": conf_score
-                }
+            return [
+                self._local_label_result(label_idx, conf_score)
+                for label_idx, conf_score in zip(predicted_class.tolist(), confidence.tolist())
+            ]
                 
         except Exception as e:
-            print(f"WARN: Local Model Inference Failed: {e}")
-            return {"risk_level": "UNKNOWN", "confidence": 0.0}
+            logger.warning("Local Model Inference Failed: %s", e)
+            return [{"risk_level": "UNKNOWN", "confidence": 0.0} for _ in messages]
+
+    @staticmethod
+    def _local_label_result(label_idx: int, conf_score: float) -> dict:
+        """Map a MobileBERT label (0=ham, 1=otp, 2=scam) to a result - must match training!"""
+        if label_idx == 2: # SCAM
+            return {
+                "risk_level": "HIGH",
+                "reason": "Flagged by Local MobileBERT",
+                "scam_type": "Suspected Scam",
+                "confidence": conf_score
+            }
+        elif label_idx == 1: # OTP
+            return {
+                "risk_level": "LOW", # OTPs are safe but sensitive
+                "reason": "Transactional OTP",
+                "scam_type": "OTP",
+                "confidence": conf_score
+            }
+        else: # HAM
+            return {
+                "risk_level": "LOW",
+                "reason": "Safe conversation",
+                "scam_type": None,
+                "confidence": conf_score
+            }
     
     def _sync_groq_call(self, message: str, sender: str) -> dict:
-        """Synchronous Groq API call with module-level caching"""
-        global _groq_cache
-        
-        # Check cache first
-        cache_key = (message, sender)
-        if cache_key in _groq_cache:
-            print(f"DEBUG: Cache hit for message from {sender}")
-            return _groq_cache[cache_key]
-        
+        """Synchronous Groq API call (results are cached by analyze())"""
         # Make API call
         response = self.client.chat.completions.create(
             model="llama-3.3-70b-versatile",
@@ -290,26 +426,19 @@ class ScamDetector:
         )
         
         result_text = response.choices[0].message.content.strip()
-        print(f"DEBUG: Groq Response: {result_text}")
+        logger.debug("Groq Response: %s", result_text)
         # Clean up if AI responds with ```json ... ```
         if result_text.startswith("```"):
             result_text = result_text.replace("```json", "").replace("```", "").strip()
-        result = json.loads(result_text)
-        
-        # Store in cache (with size limit)
-        if len(_groq_cache) >= _GROQ_CACHE_MAX_SIZE:
-            # Remove oldest entry (first key)
-            oldest_key = next(iter(_groq_cache))
-            del _groq_cache[oldest_key]
-        _groq_cache[cache_key] = result
-        
-        return result
+        return json.loads(result_text)
     
     async def _analyze_with_ai(self, message: str, sender: str) -> dict:
         """Analyze message using Groq AI (Llama 3.3) - runs sync call in thread pool"""
         try:
             # Run sync Groq call in thread pool to not block event loop
-            result = await asyncio.to_thread(self._sync_groq_call, message, sender)
+            async with self._ai_slots:
+                await self._ai_rate.acquire()
+                result = await asyncio.to_thread(self._sync_groq_call, message, sender)
             
             return {
                 "risk_level": result.get("risk_level", "LOW"),
@@ -322,7 +451,7 @@ class ScamDetector:
             # If AI returns invalid JSON, return MEDIUM as safe default
             return {
                 "risk_level": "MEDIUM",
-                "reason": "AI analysis inconclusive",
+                "reason": _AI_INCONCLUSIVE_REASON,
                 "scam_type": None,
                 "confidence": 0.5
             }
@@ -342,12 +471,13 @@ class ScamDetector:
             "confidence": result["confidence"]
         }
         
-    async def analyze_image(self, image_data: bytes) -> dict:
+    async def analyze_image(self, image_path: str) -> dict:
         """
-        Analyze an image for scam content using OpenRouter (Gemma/Gemini).
+        Analyze an image file for scam content using OpenRouter (Gemma/Gemini).
+        The file is read inside the worker thread, not on the event loop.
         """
         if not self.router_client:
-            print("DEBUG: OpenRouter client not initialized")
+            logger.debug("OpenRouter client not initialized")
             return {
                 "risk_level": "UNKNOWN",
                 "reason": "Image analysis not configured (OpenRouter API missing)",
@@ -355,25 +485,26 @@ class ScamDetector:
             }
             
         try:
-            print("DEBUG: Calling OpenRouter (Gemma-3) Vision API...")
+            logger.debug("Calling OpenRouter (Gemma-3) Vision API...")
             # Run OpenRouter call in thread pool
-            result = await asyncio.to_thread(self._sync_openrouter_call, image_data)
+            result = await asyncio.to_thread(self._sync_openrouter_call, image_path)
             return result
         except Exception as e:
-            print(f"DEBUG: OpenRouter analysis failed: {e}")
+            logger.warning("OpenRouter analysis failed: %s", e)
             return {
                 "risk_level": "UNKNOWN",
                 "reason": f"Analysis failed: {str(e)}",
                 "confidence": 0.0
             }
             
-    def _sync_openrouter_call(self, image_data: bytes) -> dict:
+    def _sync_openrouter_call(self, image_path: str) -> dict:
         """Synchronous OpenRouter API call with multiple model fallback"""
         import re
         import time
         
         # Encode image to base64
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        with open(image_path, "rb") as f:
+            base64_image = base64.b64encode(f.read()).decode('utf-8')
         
         prompt = """Analyze this image for scam/fraud content.
         Indian context: fake payment screens, suspicious WhatsApp chats, fake lottery/prize messages.
@@ -392,7 +523,7 @@ class ScamDetector:
 
         for model in models_to_try:
             try:
-                print(f"DEBUG: Attempting image analysis with {model}...")
+                logger.debug("Attempting image analysis with %s...", model)
                 start_time = time.time()
                 
                 response = self.router_client.chat.completions.create(
@@ -416,8 +547,8 @@ class ScamDetector:
                 )
                 
                 text = response.choices[0].message.content.strip()
-                print(f"DEBUG: {model} responded in {time.time() - start_time:.1f}s")
-                print(f"DEBUG: Raw Response: {text}")
+                logger.debug("%s responded in %.1fs", model, time.time() - start_time)
+                logger.debug("Raw Response: %s", text)
                 
                 # Clean up JSON
                 if "{" in text:
@@ -428,12 +559,12 @@ class ScamDetector:
                 return json.loads(text)
                 
             except Exception as e:
-                print(f"DEBUG: Model {model} failed: {e}")
+                logger.debug("Model %s failed: %s", model, e)
                 last_error = str(e)
                 continue # Try next model
         
         # If all models fail, return a safe error response
-        print(f"DEBUG: All vision models failed. Last error: {last_error}")
+        logger.warning("All vision models failed. Last error: %s", last_error)
         return {
             "risk_level": "UNKNOWN",
             "reason": f"AI models currently unavailable (429/Timeout). Please retry in 5 mins.",
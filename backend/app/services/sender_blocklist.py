@@ -0,0 +1,60 @@
+"""
+Sender Block List
+Per-user blocked senders, kept in their own small table so the check on
+every inbound SMS is a unique-index probe rather than a search of scan history.
+Scan.is_blocked is still updated for display; callers commit.
+"""
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import BlockedSender, Scan
+
+
+async def block_sender(db: AsyncSession, user_id: int, sender: str, reason: str | None = None):
+    """Add sender to the user's block list (no-op if already blocked)"""
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        dialect_insert(BlockedSender)
+        .values(user_id=user_id, sender=sender, reason=reason)
+        .on_conflict_do_nothing(index_elements=["user_id", "sender"])
+    )
+    await db.execute(
+        update(Scan)
+        .where(Scan.user_id == user_id, Scan.sender == sender)
+        .values(is_blocked=True)
+    )
+
+
+async def unblock_sender(db: AsyncSession, user_id: int, sender: str) -> bool:
+    """Remove sender from the user's block list. Returns False if it wasn't blocked."""
+    result = await db.execute(
+        delete(BlockedSender)
+        .where(BlockedSender.user_id == user_id, BlockedSender.sender == sender)
+        .returning(BlockedSender.id)
+    )
+    if result.first() is None:
+        return False
+    await db.execute(
+        update(Scan)
+        .where(Scan.user_id == user_id, Scan.sender == sender, Scan.is_blocked == True)
+        .values(is_blocked=False)
+    )
+    return True
+
+
+async def count_blocked_senders(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(
+        select(func.count(BlockedSender.id)).where(BlockedSender.user_id == user_id)
+    ) or 0
+
+
+async def list_blocked_senders(db: AsyncSession, user_id: int) -> list[BlockedSender]:
+    """The user's block list, sorted by sender"""
+    result = await db.execute(
+        select(BlockedSender)
+        .where(BlockedSender.user_id == user_id)
+        .order_by(BlockedSender.sender)
+    )
+    return result.scalars().all()
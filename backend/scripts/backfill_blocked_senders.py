@@ -0,0 +1,36 @@
+"""
+Blocked Senders Backfill Script
+Copies each user's blocked senders from scans.is_blocked into the
+blocked_senders table. Run once on databases created before the table
+existed; until then, previously blocked senders are no longer blocked.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app.db.database import Base, async_session, engine
+from app.models import BlockedSender, Scan
+from app.services import sender_blocklist
+
+
+async def backfill():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[BlockedSender.__table__])
+
+    async with async_session() as db:
+        result = await db.execute(
+            select(Scan.user_id, Scan.sender).where(Scan.is_blocked == True).distinct()
+        )
+        rows = result.all()
+        for row in rows:
+            await sender_blocklist.block_sender(db, row.user_id, row.sender, reason="Blocked by user")
+        await db.commit()
+    await engine.dispose()
+    print(f"\n✅ Backfilled {len(rows)} blocked senders")
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
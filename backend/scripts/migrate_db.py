@@ -11,20 +11,26 @@ def migrate_db():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Check if fcm_token column exists in users table
+    # Columns added to the users table after it was first created
+    new_columns = {
+        "fcm_token": "VARCHAR(255)",
+        "deleted_at": "DATETIME",
+    }
+    
     cursor.execute("PRAGMA table_info(users)")
     columns = [info[1] for info in cursor.fetchall()]
     
-    if "fcm_token" not in columns:
-        print("Migrating: Adding fcm_token column to users table...")
+    for column, column_type in new_columns.items():
+        if column in columns:
+            print(f"No migration needed: {column} column already exists.")
+            continue
+        print(f"Migrating: Adding {column} column to users table...")
         try:
-            cursor.execute("ALTER TABLE users ADD COLUMN fcm_token VARCHAR(255)")
+            cursor.execute(f"ALTER TABLE users ADD COLUMN {column} {column_type}")
             conn.commit()
-            print("Migration successful! fcm_token column added.")
+            print(f"Migration successful! {column} column added.")
         except Exception as e:
             print(f"Migration failed: {e}")
-    else:
-        print("No migration needed: fcm_token column already exists.")
         
     conn.close()
 
@@ -0,0 +1,32 @@
+"""
+Index Migration Script
+Creates any index declared on the models that is missing from the database.
+init_db's create_all only adds indexes for new tables, so run this once on
+existing databases after new indexes are added to app/models.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import Base, engine
+import app.models  # noqa: F401  (registers all tables on Base.metadata)
+
+
+def create_missing_indexes(sync_conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+            print(f"✓ {table.name}.{index.name}")
+
+
+async def migrate():
+    async with engine.begin() as conn:
+        await conn.run_sync(create_missing_indexes)
+    await engine.dispose()
+    print("\n✅ Index migration completed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
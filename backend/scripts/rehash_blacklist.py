@@ -0,0 +1,35 @@
+"""
+Blacklist Rehash Script
+Recomputes blacklist.value_hash with the current compute_hash (BLAKE2b-128).
+Run once on databases created while value_hash was SHA256; until then,
+lookups for existing entries miss.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app.db.database import async_session, engine
+from app.models import Blacklist
+from app.services.blacklist_manager import BlacklistManager
+
+
+async def rehash():
+    updated = 0
+    async with async_session() as db:
+        result = await db.execute(select(Blacklist))
+        for entry in result.scalars():
+            # value is stored already normalized, so it hashes directly
+            new_hash = BlacklistManager.compute_hash(entry.value)
+            if entry.value_hash != new_hash:
+                entry.value_hash = new_hash
+                updated += 1
+        await db.commit()
+    await engine.dispose()
+    print(f"\n✅ Rehashed {updated} blacklist entries")
+
+
+if __name__ == "__main__":
+    asyncio.run(rehash())
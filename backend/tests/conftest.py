@@ -10,7 +10,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.db.database import Base, get_db
+from app.db.database import Base, get_db, engine as app_engine
 from app.models import User
 from app.routers.auth import create_access_token, get_password_hash
 
@@ -51,6 +51,15 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def dispose_engines():
+    """Close pooled connections so aiosqlite's worker threads let pytest exit"""
+    yield
+    asyncio.run(test_engine.dispose())
+    # Background tasks (guardian alerts, audit flushes) open sessions on the app engine
+    asyncio.run(app_engine.dispose())
+
+
 @pytest.fixture(scope="function")
 async def db_session():
     """Create fresh database for each test"""
@@ -79,7 +88,8 @@ async def test_user(db_session):
     user = User(
         email="test@example.com",
         password_hash=hashed_password,
-        name="Test User",
+        first_name="Test",
+        last_name="User",
         phone="+919876543210"
     )
     db_session.add(user)
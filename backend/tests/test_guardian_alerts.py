@@ -0,0 +1,91 @@
+"""
+Guardian Alerts Tests
+Tests for /api/guardian-alerts endpoints
+"""
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+
+from app.models import Scan, GuardianAlert, RiskLevel
+from app.services.guardian_alert_service import invalidate_pending_alerts_cache
+
+
+async def _create_alerts(db_session, user, statuses, step=timedelta(minutes=1)):
+    """Create one HIGH scan + alert per status, `step` apart (oldest first)"""
+    start = datetime(2026, 1, 1)
+    for i, alert_status in enumerate(statuses):
+        scan = Scan(user_id=user.id, sender=f"SENDER{i}", message="Win a prize", risk_level=RiskLevel.HIGH)
+        db_session.add(scan)
+        await db_session.flush()
+        db_session.add(GuardianAlert(
+            guardian_id=user.id,
+            user_id=user.id,
+            scan_id=scan.id,
+            status=alert_status,
+            created_at=start + step * i
+        ))
+    await db_session.commit()
+    # Inserted directly, so drop any /pending response cached by an earlier test
+    await invalidate_pending_alerts_cache(user.id)
+
+
+class TestGuardianAlertEndpoints:
+    """Tests for guardian alert polling and history"""
+
+    @pytest.mark.asyncio
+    async def test_pending_alerts_empty(self, authenticated_client: AsyncClient):
+        """Test polling with no alerts"""
+        response = await authenticated_client.get("/api/guardian-alerts/pending")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_pending_alerts_excludes_actioned(self, authenticated_client: AsyncClient, db_session, test_user):
+        """Test only pending/seen alerts are returned, newest first"""
+        await _create_alerts(db_session, test_user, ["pending", "actioned", "seen"])
+
+        response = await authenticated_client.get("/api/guardian-alerts/pending")
+        assert response.status_code == 200
+        assert [a["status"] for a in response.json()] == ["seen", "pending"]
+
+    @pytest.mark.asyncio
+    async def test_history_keyset_pagination(self, authenticated_client: AsyncClient, db_session, test_user):
+        """Test paging history with the X-Next-Cursor header"""
+        await _create_alerts(db_session, test_user, ["actioned"] * 3)
+
+        first = await authenticated_client.get("/api/guardian-alerts/history?limit=2")
+        assert first.status_code == 200
+        assert [a["sender"] for a in first.json()] == ["SENDER2", "SENDER1"]
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = await authenticated_client.get(
+            "/api/guardian-alerts/history",
+            params={"limit": 2, "before": cursor}
+        )
+        assert [a["sender"] for a in second.json()] == ["SENDER0"]
+        assert "X-Next-Cursor" not in second.headers
+
+    @pytest.mark.asyncio
+    async def test_history_pagination_same_timestamp(self, authenticated_client: AsyncClient, db_session, test_user):
+        """Test alerts sharing the boundary timestamp aren't skipped on the next page"""
+        await _create_alerts(db_session, test_user, ["actioned"] * 3, step=timedelta(0))
+
+        first = await authenticated_client.get("/api/guardian-alerts/history?limit=2")
+        second = await authenticated_client.get(
+            "/api/guardian-alerts/history",
+            params={"limit": 2, "before": first.headers["X-Next-Cursor"]}
+        )
+        senders = [a["sender"] for a in first.json() + second.json()]
+        assert senders == ["SENDER2", "SENDER1", "SENDER0"]
+
+    @pytest.mark.asyncio
+    async def test_history_invalid_cursor(self, authenticated_client: AsyncClient):
+        """Test a malformed cursor is rejected"""
+        response = await authenticated_client.get("/api/guardian-alerts/history", params={"before": "yesterday"})
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_pending_alerts_no_auth(self, client: AsyncClient):
+        """Test polling without auth fails"""
+        response = await client.get("/api/guardian-alerts/pending")
+        assert response.status_code == 401
@@ -0,0 +1,80 @@
+"""
+Privacy Tests
+Tests for /api/privacy endpoints
+"""
+import pytest
+from httpx import AsyncClient
+
+
+class TestGdprExport:
+    """Tests for the streamed GDPR data export"""
+
+    @pytest.mark.asyncio
+    async def test_export_includes_consent_history(self, authenticated_client: AsyncClient, test_user):
+        """Test export streams a complete JSON document with newest consent first"""
+        for consent in (True, False):
+            await authenticated_client.post(
+                "/api/privacy/consent/training-data",
+                json={"consent": consent}
+            )
+
+        response = await authenticated_client.post("/api/privacy/gdpr/export-data")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+
+        data = response.json()
+        assert data["user_profile"]["email"] == test_user.email
+        assert [log["given"] for log in data["consent_history"]] == [False, True]
+        assert "generated_at" in data
+
+    @pytest.mark.asyncio
+    async def test_export_no_auth(self, client: AsyncClient):
+        """Test export without auth fails"""
+        response = await client.post("/api/privacy/gdpr/export-data")
+        assert response.status_code == 401
+
+
+class TestAccountDeletion:
+    """Tests for GDPR account deletion"""
+
+    @pytest.mark.asyncio
+    async def test_delete_account_revokes_access(self, authenticated_client: AsyncClient):
+        """Test a deleted account can no longer authenticate"""
+        response = await authenticated_client.post(
+            "/api/privacy/gdpr/delete-account",
+            json={"confirmation": "DELETE MY ACCOUNT"}
+        )
+        assert response.status_code == 200
+
+        response = await authenticated_client.get("/api/privacy/consent/status")
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_delete_account_wrong_confirmation(self, authenticated_client: AsyncClient):
+        """Test deletion requires the exact confirmation string"""
+        response = await authenticated_client.post(
+            "/api/privacy/gdpr/delete-account",
+            json={"confirmation": "delete"}
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_sweep_purges_deleted_accounts(self, db_session, test_user):
+        """Test the sweep purges deleted accounts a background purge missed, and only those"""
+        from datetime import datetime
+        from sqlalchemy import select
+        from app.models import User
+        from app.services.account_purge import purge_deleted_accounts
+
+        disabled = User(
+            email="disabled@example.com", password_hash="x",
+            first_name="Disabled", last_name="User", is_active=False
+        )
+        db_session.add(disabled)
+        test_user.is_active = False
+        test_user.deleted_at = datetime.utcnow()
+        await db_session.commit()
+
+        assert await purge_deleted_accounts(db_session) == 1
+        result = await db_session.execute(select(User.id))
+        assert result.scalars().all() == [disabled.id]
@@ -2,6 +2,7 @@
 Reputation Database Tests
 Tests for /api/reputation endpoints
 """
+import json
 import pytest
 from httpx import AsyncClient
 
@@ -166,3 +167,30 @@ class TestReputationEndpoints:
             params={"phone": "+919876543210"}
         )
         assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_export_training_data_jsonl(self, authenticated_client: AsyncClient):
+        """Test training export streams one chat record per line"""
+        await authenticated_client.post(
+            "/api/reputation/report",
+            json={"value": "+919111111111", "type": "phone"}
+        )
+        
+        response = await authenticated_client.get(
+            "/api/reputation/export/training-data",
+            params={"min_confidence": 0.0, "verified_only": False}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        for line in response.text.splitlines():
+            assert "messages" in json.loads(line)
+
+    @pytest.mark.asyncio
+    async def test_export_training_data_csv_header(self, authenticated_client: AsyncClient):
+        """Test csv export always starts with the header row"""
+        response = await authenticated_client.get(
+            "/api/reputation/export/training-data",
+            params={"format": "csv", "verified_only": True}
+        )
+        assert response.status_code == 200
+        assert response.text.startswith("type,value,scam_type")
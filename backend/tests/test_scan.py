@@ -3,8 +3,11 @@ Scan Service Tests
 Tests for /api/scan endpoints
 """
 import pytest
+from datetime import datetime
 from httpx import AsyncClient
 
+from app.models import Scan, RiskLevel
+
 
 class TestScanEndpoints:
     """Tests for scan functionality"""
@@ -56,6 +59,24 @@ class TestScanEndpoints:
         assert isinstance(data, list)
         assert len(data) >= 1
 
+    @pytest.mark.asyncio
+    async def test_scan_history_pagination_same_timestamp(self, authenticated_client: AsyncClient, db_session, test_user):
+        """Test scans sharing the boundary timestamp aren't skipped on the next page"""
+        created_at = datetime(2026, 1, 1)
+        db_session.add_all([
+            Scan(user_id=test_user.id, sender=f"SENDER{i}", risk_level=RiskLevel.LOW, created_at=created_at)
+            for i in range(3)
+        ])
+        await db_session.commit()
+
+        first = await authenticated_client.get("/api/scan/history", params={"limit": 2})
+        second = await authenticated_client.get(
+            "/api/scan/history",
+            params={"limit": 2, "before": first.headers["X-Next-Cursor"]}
+        )
+        senders = [s["sender"] for s in first.json() + second.json()]
+        assert senders == ["SENDER2", "SENDER1", "SENDER0"]
+
     @pytest.mark.asyncio
     async def test_get_scan_detail(self, authenticated_client: AsyncClient):
         """Test getting details of a specific scan"""
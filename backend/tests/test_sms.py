@@ -40,6 +40,26 @@ class TestSmsAnalysisEndpoints:
         data = response.json()
         assert data["risk_level"] in ["HIGH", "MEDIUM"]
 
+    @pytest.mark.asyncio
+    async def test_analyze_sms_trusted_sender(self, authenticated_client: AsyncClient):
+        """Test messages from a trusted sender skip detection"""
+        await authenticated_client.post(
+            "/api/trusted/add",
+            json={"sender": "VM-HDFCBK", "name": "HDFC Bank"}
+        )
+
+        response = await authenticated_client.post(
+            "/api/sms/analyze",
+            json={
+                "sender": "VM-HDFCBK",
+                "message": "Your bank account has been suspended! Click here immediately: bit.ly/scam123"
+            }
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["risk_level"] == "LOW"
+        assert "trusted" in data["reason"].lower()
+
     @pytest.mark.asyncio
     async def test_analyze_sms_creates_scan(self, authenticated_client: AsyncClient):
         """Test that SMS analysis creates a scan record"""
@@ -55,6 +75,22 @@ class TestSmsAnalysisEndpoints:
         data = response.json()
         assert "scan_id" in data
 
+    @pytest.mark.asyncio
+    async def test_analyze_batch_preserves_order(self, authenticated_client: AsyncClient):
+        """Test batch analysis returns one result per message, in request order"""
+        messages = [
+            {"sender": f"SENDER{i}", "message": f"Batch message {i}"}
+            for i in range(5)
+        ]
+        response = await authenticated_client.post(
+            "/api/sms/analyze-batch",
+            json={"messages": messages}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["sender"] for r in data] == [m["sender"] for m in messages]
+        assert len({r["scan_id"] for r in data}) == 5
+
     @pytest.mark.asyncio
     async def test_get_recent_sms(self, authenticated_client: AsyncClient):
         """Test getting recent SMS scans"""
@@ -79,6 +115,23 @@ class TestSmsAnalysisEndpoints:
         response = await authenticated_client.get("/api/sms/recent?limit=5")
         assert response.status_code == 200
 
+    @pytest.mark.asyncio
+    async def test_get_recent_sms_paginates(self, authenticated_client: AsyncClient):
+        """Test paging through recent SMS with the X-Next-Cursor header"""
+        for i in range(3):
+            await authenticated_client.post(
+                "/api/sms/analyze",
+                json={"sender": f"PAGE{i}", "message": f"Page test {i}"}
+            )
+
+        first = await authenticated_client.get("/api/sms/recent", params={"limit": 2})
+        assert len(first.json()) == 2
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = await authenticated_client.get("/api/sms/recent", params={"limit": 2, "before": cursor})
+        assert [r["sender"] for r in second.json()] == ["PAGE0"]
+        assert "X-Next-Cursor" not in second.headers
+
     @pytest.mark.asyncio
     async def test_block_sender(self, authenticated_client: AsyncClient):
         """Test blocking a sender"""
@@ -95,6 +148,23 @@ class TestSmsAnalysisEndpoints:
         response = await authenticated_client.post("/api/sms/block/+918888888888")
         assert response.status_code == 200
 
+    @pytest.mark.asyncio
+    async def test_blocked_sender_flagged_high(self, authenticated_client: AsyncClient):
+        """Test messages from a blocked sender are flagged without analysis"""
+        await authenticated_client.post("/api/sms/block/+916666666666")
+
+        response = await authenticated_client.post(
+            "/api/sms/analyze",
+            json={"sender": "+916666666666", "message": "Hi, how are you doing today?"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["is_blocked"] == True
+        assert data["risk_level"] == "HIGH"
+
+        response = await authenticated_client.get("/api/sms/blocked")
+        assert [b["sender"] for b in response.json()] == ["+916666666666"]
+
     @pytest.mark.asyncio
     async def test_unblock_sender(self, authenticated_client: AsyncClient):
         """Test unblocking a sender"""
@@ -99,6 +99,23 @@ class TestTrustedSenderEndpoints:
         data = response.json()
         assert data["is_trusted"] == False
 
+    @pytest.mark.asyncio
+    async def test_check_reflects_add_and_remove(self, authenticated_client: AsyncClient):
+        """Test a cached check result is dropped when the trusted list changes"""
+        response = await authenticated_client.get("/api/trusted/check/+915555555555")
+        assert response.json()["is_trusted"] == False
+
+        await authenticated_client.post(
+            "/api/trusted/add",
+            json={"sender": "+915555555555", "name": "Bank"}
+        )
+        response = await authenticated_client.get("/api/trusted/check/+915555555555")
+        assert response.json() == {"sender": "+915555555555", "is_trusted": True, "name": "Bank"}
+
+        await authenticated_client.delete("/api/trusted/+915555555555")
+        response = await authenticated_client.get("/api/trusted/check/+915555555555")
+        assert response.json()["is_trusted"] == False
+
     @pytest.mark.asyncio
     async def test_remove_trusted_sender(self, authenticated_client: AsyncClient):
         """Test removing a trusted sender"""
@@ -23,6 +23,40 @@ class TestUserStatsEndpoints:
         assert "low_risk_safe" in data
         assert "protection_score" in data
 
+    @pytest.mark.asyncio
+    async def test_user_stats_counts(self, authenticated_client: AsyncClient):
+        """Test stats reflect scans, trusted and blocked senders made after a cached read"""
+        response = await authenticated_client.get("/api/user/stats")
+        assert response.json()["total_scans"] == 0
+
+        await authenticated_client.post(
+            "/api/sms/analyze",
+            json={"sender": "+919876543210", "message": "Hi, how are you doing today?"}
+        )
+        await authenticated_client.post("/api/sms/block/+918888888888")
+        await authenticated_client.post("/api/trusted/add", json={"sender": "VM-HDFCBK"})
+
+        response = await authenticated_client.get("/api/user/stats")
+        data = response.json()
+        assert data["total_scans"] == 1
+        assert data["low_risk_safe"] == 1
+        assert data["trusted_senders_count"] == 1
+        assert data["blocked_senders_count"] == 1
+        assert data["last_scan_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_fetch_one_own_session(self, db_session, test_user):
+        """Test the second stats query runs on its own session over the request's engine"""
+        from sqlalchemy import select, func
+        from app.models import Scan
+        from app.routers.user import _fetch_one_own_session
+
+        row = await _fetch_one_own_session(
+            db_session.bind,
+            select(func.count()).where(Scan.user_id == test_user.id)
+        )
+        assert row == (0,)
+
     @pytest.mark.asyncio
     async def test_stats_no_auth(self, client: AsyncClient):
         """Test stats require authentication"""
@@ -114,3 +148,47 @@ class TestUserSettingsEndpoints:
         """Test settings require authentication"""
         response = await client.get("/api/user/settings")
         assert response.status_code == 401
+
+
+class TestUserProfileEndpoints:
+    """Tests for user profile"""
+
+    @pytest.mark.asyncio
+    async def test_update_profile_name(self, authenticated_client: AsyncClient):
+        """Test name updates are stored and reflected in the display name"""
+        response = await authenticated_client.put(
+            "/api/user/profile",
+            json={"first_name": " Asha ", "middle_name": "K", "last_name": "Rao"}
+        )
+        assert response.status_code == 200
+        assert response.json()["name"] == "Asha K Rao"
+
+        response = await authenticated_client.get("/api/user/profile")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["first_name"] == "Asha"
+        assert data["name"] == "Asha K Rao"
+
+    @pytest.mark.asyncio
+    async def test_delete_account(self, authenticated_client: AsyncClient, db_session, test_user):
+        """Test deleting the account revokes access and purges the user"""
+        from sqlalchemy import select
+        from app.models import User
+
+        response = await authenticated_client.request(
+            "DELETE", "/api/user/delete-account", json={"password": "testpass123"}
+        )
+        assert response.status_code == 200
+
+        response = await authenticated_client.get("/api/user/profile")
+        assert response.status_code == 401
+        result = await db_session.execute(select(User.id).where(User.id == test_user.id))
+        assert result.scalar_one_or_none() is None
+
+    @pytest.mark.asyncio
+    async def test_delete_account_wrong_password(self, authenticated_client: AsyncClient):
+        """Test deletion requires the correct password"""
+        response = await authenticated_client.request(
+            "DELETE", "/api/user/delete-account", json={"password": "wrongpass"}
+        )
+        assert response.status_code == 400